@@ -0,0 +1,22 @@
+from django.urls import re_path
+from rest_framework.routers import SimpleRouter
+
+from api.async_views import offload
+from api.views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+router = SimpleRouter()
+
+router.register(r'recipes', RecipeViewSet, basename='recipes')
+router.register(r'ingredients', IngredientViewSet, basename='ingredients')
+router.register(r'tags', TagViewSet, basename='tags')
+
+# Только list и detail: остальные действия, в том числе потоковая
+# выгрузка списка покупок, обслуживаются синхронными маршрутами.
+# Первичный ключ только числовой, иначе detail перехватит действия
+# списка вроде recipes/shopping_cart/ раньше синхронного роутера.
+urlpatterns = [
+    re_path(str(url.pattern).replace('[^/.]+', r'\d+'),
+            offload(url.callback), name=url.name)
+    for url in router.urls
+    if url.name.endswith(('-list', '-detail'))
+]
@@ -0,0 +1,31 @@
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from rest_framework.permissions import SAFE_METHODS
+
+
+def offload(view):
+    '''
+    Асинхронная обёртка синхронного представления DRF.
+    Запрос выполняется в общем пуле потоков, а не в единственном потоке
+    для синхронного кода ASGI, поэтому запросы к БД идут параллельно.
+    Ответ рендерится там же теми же сериализаторами.
+    Изменяющие запросы выполняются как обычные синхронные представления
+    под ASGI: в общем потоке, вместе с транзакциями и сигналами.
+    '''
+    def run(request, *args, **kwargs):
+        close_old_connections()
+        try:
+            response = view(request, *args, **kwargs)
+            if callable(getattr(response, 'render', None)):
+                response = response.render()
+            return response
+        finally:
+            close_old_connections()
+
+    async def async_view(request, *args, **kwargs):
+        return await sync_to_async(
+            run, thread_sensitive=request.method not in SAFE_METHODS
+        )(request, *args, **kwargs)
+
+    async_view.csrf_exempt = getattr(view, 'csrf_exempt', False)
+    return async_view
@@ -0,0 +1,94 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+
+from api.cache import get_generations
+from api.metrics import record_cache
+
+TOKEN_KEY = 'api:token-id:{}'
+
+
+def auth_scope(user_id):
+    '''Область поколений кэша токенов пользователя.'''
+    return f'auth-{user_id}'
+
+
+class LRUCache:
+    """Ограниченный по размеру кэш процесса со сроком жизни записей."""
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+local_tokens = LRUCache(settings.TOKEN_CACHE_SIZE,
+                        settings.TOKEN_CACHE_TIMEOUT)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Токен -> id пользователя из кэша процесса, затем из общего кэша.
+    Запись действительна, пока не сменилось поколение auth-<id>
+    пользователя: так выход, смена пароля, деактивация и удаление
+    сразу отзывают токен во всех процессах. Сам пользователь каждый
+    раз читается из БД по первичному ключу: объект из кэша мог
+    устареть, а представления djoser сохраняют request.user целиком.
+    Поколения видны всем процессам только в общем кэше, поэтому
+    с кэшем процесса (CACHE_SHARED ложно) токены проверяются по БД
+    каждый раз.
+    """
+    def authenticate_credentials(self, key):
+        if not settings.CACHE_SHARED:
+            return super().authenticate_credentials(key)
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        entry = (local_tokens.get(digest)
+                 or cache.get(TOKEN_KEY.format(digest)))
+        if entry is not None:
+            user_id, generation = entry
+            if get_generations((auth_scope(user_id),))[0] == generation:
+                user = (get_user_model().objects
+                        .filter(pk=user_id, is_active=True).first())
+                if user is not None:
+                    record_cache('token', True)
+                    local_tokens.set(digest, entry)
+                    return user, self.get_model()(key=key, user=user)
+        record_cache('token', False)
+        # Поколение читается до загрузки пользователя: отзыв во время
+        # загрузки не оставит в кэше устаревшую запись.
+        user_id = (self.get_model().objects.filter(key=key)
+                   .values_list('user_id', flat=True).first())
+        if user_id is None:
+            return super().authenticate_credentials(key)
+        generation = get_generations((auth_scope(user_id),))[0]
+        user, token = super().authenticate_credentials(key)
+        entry = (user.id, generation)
+        cache.set(TOKEN_KEY.format(digest), entry,
+                  settings.TOKEN_CACHE_TIMEOUT)
+        local_tokens.set(digest, entry)
+        return user, token
@@ -0,0 +1,144 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from api.metrics import record_cache
+from backend.db_router import primary_if
+
+GENERATION_KEY = 'api:generation:{}'
+RESPONSE_KEY = 'api:response:{view}:{action}:{generations}:{digest}'
+
+
+def get_generations(scopes):
+    '''
+    Текущие поколения кэша для перечисленных областей.
+    Поколение - время последнего изменения области в наносекундах.
+    '''
+    keys = [GENERATION_KEY.format(scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, time.time_ns(), timeout=None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def bump_generation(*scopes):
+    '''Инвалидация всех ответов областей сменой поколения.'''
+    now = time.time_ns()
+    cache.set_many(
+        {GENERATION_KEY.format(scope): now for scope in scopes},
+        timeout=None
+    )
+
+
+def recipe_scope(recipe_id):
+    '''Область поколений фрагмента карточки рецепта.'''
+    return f'recipe-{recipe_id}'
+
+
+def author_scope(user_id):
+    '''Область поколений данных автора в карточках его рецептов.'''
+    return f'author-{user_id}'
+
+
+def recently_changed(generations):
+    '''
+    Изменения, которые реплика могла ещё не получить: такие ответы
+    читаются с основной БД, чтобы не закэшировать устаревшие данные.
+    '''
+    return (time.time_ns() - max(generations)
+            < settings.REPLICA_PIN_SECONDS * 10 ** 9)
+
+
+def normalize_query(request):
+    '''Запрос без зависимости от порядка параметров и их значений.'''
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in sorted(values)
+    )
+    return '{}://{}{}?{}'.format(request.scheme, request.get_host(),
+                                 request.path, urlencode(params))
+
+
+class AnonymousCacheMixin:
+    """
+    Общий кэш ответов list/retrieve для неавторизованных пользователей.
+    Ответы сбрасываются сменой поколения областей cache_scopes.
+    """
+    cache_scopes = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+        generations = get_generations(self.cache_scopes)
+        key = RESPONSE_KEY.format(
+            view=self.basename,
+            action=self.action,
+            generations=':'.join(map(str, generations)),
+            digest=hashlib.md5(
+                normalize_query(request).encode()).hexdigest(),
+        )
+        data = cache.get(key)
+        record_cache('response', data is not None)
+        if data is not None:
+            return Response(data)
+        with primary_if(recently_changed(generations)):
+            response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+        return response
+
+
+class ConditionalGetMixin:
+    """
+    Слабый ETag и Last-Modified для list/retrieve по поколениям cache_scopes
+    и, для авторизованных, по поколению данных пользователя.
+    304 возвращается до сериализации.
+    """
+    cache_scopes = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs)
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        scopes = list(self.cache_scopes)
+        if request.user.is_authenticated:
+            scopes.append(f'user-{request.user.id}')
+        generations = get_generations(scopes)
+        etag = 'W/"{}"'.format(hashlib.md5(':'.join(map(str, (
+            self.basename, self.action, request.user.id,
+            normalize_query(request), *generations
+        ))).encode()).hexdigest())
+        last_modified = max(generations) // 10 ** 9
+        response = get_conditional_response(
+            request._request, etag=etag, last_modified=last_modified)
+        record_cache('conditional', response is not None)
+        if response is None:
+            with primary_if(recently_changed(generations)):
+                response = handler(request, *args, **kwargs)
+        if response.status_code not in (200, 304):
+            return response
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Authorization',))
+        return response
@@ -0,0 +1,119 @@
+import orjson
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import serializers
+
+from api.cache import author_scope, get_generations, recipe_scope
+from api.metrics import record_cache
+from api.representations import recipe_details
+from recipes.models import Favorite, ShoppingList
+from users.models import Follow
+
+CARD_KEY = 'api:card:{recipe}:{generations}'
+
+# Поля страницы рецептов: автор нужен для ключа фрагмента,
+# остальные - курсорному пагинатору для всех сортировок ленты.
+PAGE_FIELDS = ('id', 'author', 'pub_date', 'cooking_time',
+               'favorites_count', 'trending_score')
+
+
+def build_fragments(ids):
+    '''
+    Общая для всех пользователей часть карточки в JSON:
+    флаги ложны, ссылки на изображения относительные.
+    '''
+    return {
+        recipe_id: orjson.dumps(recipe)
+        for recipe_id, recipe in recipe_details(ids).items()
+    }
+
+
+def user_flags(user, recipe_ids, author_ids):
+    '''Избранное, список покупок и подписки пользователя: три запроса.'''
+    if not user.is_authenticated:
+        return set(), set(), set()
+    return (
+        set(Favorite.objects.filter(user=user, recipe__in=recipe_ids)
+            .values_list('recipe', flat=True)),
+        set(ShoppingList.objects.filter(user=user, recipe_id__in=recipe_ids)
+            .values_list('recipe_id', flat=True)),
+        set(Follow.objects.filter(user=user, following__in=author_ids)
+            .values_list('following', flat=True)),
+    )
+
+
+def absolute_image_urls(card, request):
+    if card['image']:
+        card['image'] = request.build_absolute_uri(card['image'])
+    for formats in (card['image_renditions'] or {}).values():
+        for extension, url in formats.items():
+            formats[extension] = request.build_absolute_uri(url)
+
+
+def recipe_cards(recipes, request):
+    '''
+    Карточки рецептов из фрагментов кэша с флагами текущего пользователя.
+    Фрагмент действителен, пока не сменились поколения рецепта, автора,
+    тегов и ингредиентов; недостающие собираются вместе.
+    '''
+    if not recipes:
+        return []
+    scopes = list(dict.fromkeys(
+        scope for recipe in recipes
+        for scope in (recipe_scope(recipe.id),
+                      author_scope(recipe.author_id))
+    )) + ['tags', 'ingredients']
+    generations = dict(zip(scopes, get_generations(scopes)))
+    keys = {
+        recipe.id: CARD_KEY.format(
+            recipe=recipe.id,
+            generations=':'.join(str(generations[scope]) for scope in (
+                recipe_scope(recipe.id), author_scope(recipe.author_id),
+                'tags', 'ingredients'
+            ))
+        )
+        for recipe in recipes
+    }
+    fragments = cache.get_many(keys.values())
+    missing = [recipe_id for recipe_id, key in keys.items()
+               if key not in fragments]
+    record_cache('card', True, len(keys) - len(missing))
+    if missing:
+        record_cache('card', False, len(missing))
+        built = {keys[recipe_id]: fragment for recipe_id, fragment
+                 in build_fragments(missing).items()}
+        cache.set_many(built, settings.RECIPE_CARD_TIMEOUT)
+        fragments.update(built)
+    favorited, in_cart, subscribed = user_flags(
+        request.user, list(keys), {recipe.author_id for recipe in recipes})
+    cards = []
+    for recipe in recipes:
+        fragment = fragments.get(keys[recipe.id])
+        if fragment is None:
+            # Рецепт удалён после выборки страницы.
+            continue
+        card = orjson.loads(fragment)
+        card['is_favorited'] = recipe.id in favorited
+        card['is_in_shopping_cart'] = recipe.id in in_cart
+        if card['author'] is not None:
+            card['author']['is_subscribed'] = recipe.author_id in subscribed
+        absolute_image_urls(card, request)
+        cards.append(card)
+    return cards
+
+
+class RecipeCardListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        return recipe_cards(list(data), self.context['request'])
+
+
+class RecipeCardSerializer(serializers.BaseSerializer):
+    """
+    Рецепт в формате RecipeGetSerializer, собранный из готового
+    фрагмента и флагов текущего пользователя.
+    """
+    class Meta:
+        list_serializer_class = RecipeCardListSerializer
+
+    def to_representation(self, instance):
+        return recipe_cards([instance], self.context['request'])[0]
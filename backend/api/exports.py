@@ -0,0 +1,96 @@
+import csv
+import io
+import json
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen.canvas import Canvas
+from rest_framework.negotiation import BaseContentNegotiation
+
+EXPORT_RENDERERS = {}
+
+
+def register_export(format, content_type):
+    '''Регистрация генератора выгрузки списка покупок.'''
+    def decorator(func):
+        func.content_type = content_type
+        EXPORT_RENDERERS[format] = func
+        return func
+    return decorator
+
+
+class IgnoreFormatNegotiation(BaseContentNegotiation):
+    """
+    Параметр ?format= выгрузки выбирает формат файла,
+    а не рендерер DRF.
+    """
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return (renderers[0], renderers[0].media_type)
+
+
+@register_export('txt', 'text/plain')
+def export_txt(rows):
+    yield 'Cписок покупок:\n'
+    separator = ''
+    for name, amount, unit in rows:
+        yield f'{separator}{name} - {amount} {unit}.'
+        separator = '\n'
+
+
+class Echo:
+    """Буфер, возвращающий записанную строку вместо её хранения."""
+    def write(self, value):
+        return value
+
+
+@register_export('csv', 'text/csv')
+def export_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'amount', 'measurement_unit'))
+    for row in rows:
+        yield writer.writerow(row)
+
+
+@register_export('json', 'application/json')
+def export_json(rows):
+    yield '['
+    separator = ''
+    for name, amount, unit in rows:
+        yield separator + json.dumps(
+            {'name': name, 'amount': amount, 'measurement_unit': unit},
+            ensure_ascii=False
+        )
+        separator = ','
+    yield ']'
+
+
+@register_export('pdf', 'application/pdf')
+def export_pdf(rows):
+    """
+    Таблица смещений PDF пишется в конец файла, поэтому документ
+    собирается целиком и отдаётся частями.
+    """
+    pdfmetrics.registerFont(TTFont('ExportFont', settings.PDF_FONT_PATH))
+    buffer = io.BytesIO()
+    canvas = Canvas(buffer, pagesize=A4)
+    width, height = A4
+    margin, line_height = 50, 18
+    y = height - margin
+    canvas.setFont('ExportFont', 16)
+    canvas.drawString(margin, y, 'Cписок покупок:')
+    canvas.setFont('ExportFont', 12)
+    for name, amount, unit in rows:
+        y -= line_height
+        if y < margin:
+            canvas.showPage()
+            canvas.setFont('ExportFont', 12)
+            y = height - margin
+        canvas.drawString(margin, y, f'{name} - {amount} {unit}.')
+    canvas.save()
+    buffer.seek(0)
+    yield from iter(lambda: buffer.read(settings.EXPORT_CHUNK_SIZE), b'')
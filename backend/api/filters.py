@@ -1,13 +1,26 @@
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
 
-from recipes.models import Recipe, Tag
+from api.tag_map import tag_choices, tag_map
+from recipes.models import Favorite, Recipe, ShoppingList
+from recipes.search import search_recipes
+
+ORDERINGS = {
+    'trending': ('-trending_score', '-id'),
+    'popular': ('-favorites_count', '-id'),
+    'cooking_time': ('cooking_time', '-id'),
+}
 
 
 class RecipeFilter(FilterSet):
-    tags = filters.ModelMultipleChoiceFilter(
-        queryset=Tag.objects.all(),
-        field_name='tags__slug',
-        to_field_name='slug',
+    """
+    Фильтры по связанным таблицам - полусоединения EXISTS:
+    строки рецептов не размножаются при любом сочетании фильтров.
+    """
+    tags = filters.MultipleChoiceFilter(
+        label='Теги',
+        choices=tag_choices,
+        method='get_tags'
     )
     is_favorited = filters.BooleanFilter(
         label='Избранное',
@@ -17,17 +30,44 @@ class RecipeFilter(FilterSet):
         label='В списке покупок',
         method='get_is_in_shopping_cart'
     )
+    search = filters.CharFilter(
+        label='Поиск по названию и описанию',
+        method='get_search'
+    )
+    ordering = filters.ChoiceFilter(
+        label='Сортировка',
+        choices=[(name, name) for name in ORDERINGS],
+        method='get_ordering'
+    )
 
     class Meta:
         model = Recipe
         fields = ('author', 'tags', )
 
+    def get_tags(self, queryset, name, value):
+        slugs = tag_map.get()
+        ids = [slugs[slug] for slug in value if slug in slugs]
+        if not ids:
+            return queryset.none()
+        return queryset.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe=OuterRef('pk'), tag_id__in=ids)
+        ))
+
     def get_is_favorited(self, queryset, name, value):
         if self.request.user.is_authenticated and value:
-            return queryset.filter(favorites__user=self.request.user)
+            return queryset.filter(Exists(Favorite.objects.filter(
+                user=self.request.user, recipe=OuterRef('pk'))))
         return queryset
 
     def get_is_in_shopping_cart(self, queryset, name, value):
         if self.request.user.is_authenticated and value:
-            return queryset.filter(recipe_list__user=self.request.user)
+            return queryset.filter(Exists(ShoppingList.objects.filter(
+                user=self.request.user, recipe_id=OuterRef('pk'))))
         return queryset
+
+    def get_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def get_ordering(self, queryset, name, value):
+        return queryset.order_by(*ORDERINGS[value])
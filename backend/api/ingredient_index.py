@@ -0,0 +1,89 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db.models import Count
+
+from api.cache import get_generations
+from recipes.models import Ingredient, SumIngredients
+
+
+def normalize(value):
+    '''Приведение названия к виду для поиска без учёта регистра и ё.'''
+    return value.casefold().replace('ё', 'е')
+
+
+class IngredientIndex:
+    """
+    Отсортированный массив названий ингредиентов в памяти процесса.
+    Перестраивается при смене поколения кэша ингредиентов
+    и по истечении INGREDIENT_INDEX_TTL для обновления популярности.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.generation = None
+        self.built_at = 0
+        self.state = ([], [], {})
+
+    def is_stale(self, generation):
+        return (generation != self.generation
+                or time.monotonic() - self.built_at
+                > settings.INGREDIENT_INDEX_TTL)
+
+    def build(self, generation):
+        popularity = dict(
+            SumIngredients.objects.order_by()
+            .values_list('ingredient')
+            .annotate(total=Count('id'))
+        )
+        entries = sorted(
+            ((normalize(ingredient.name), ingredient)
+             for ingredient in Ingredient.objects.all()),
+            key=lambda entry: entry[0]
+        )
+        self.state = (
+            [key for key, _ in entries],
+            [ingredient for _, ingredient in entries],
+            popularity,
+        )
+        self.generation = generation
+        self.built_at = time.monotonic()
+
+    def refresh(self):
+        generation = get_generations(('ingredients',))[0]
+        if self.is_stale(generation):
+            with self.lock:
+                if self.is_stale(generation):
+                    self.build(generation)
+
+    @staticmethod
+    def rank(entries, popularity, limit):
+        return [
+            ingredient for _, ingredient in heapq.nsmallest(
+                limit, entries,
+                key=lambda entry: -popularity.get(entry[1].id, 0)
+            )
+        ]
+
+    def search(self, query, limit):
+        '''Сначала совпадения по началу названия, затем по вхождению.'''
+        self.refresh()
+        keys, ingredients, popularity = self.state
+        query = normalize(query)
+        start = bisect_left(keys, query)
+        end = bisect_left(keys, query + '\uffff', start)
+        result = self.rank(zip(keys[start:end], ingredients[start:end]),
+                           popularity, limit)
+        if len(result) < limit:
+            contained = (
+                (key, ingredient)
+                for key, ingredient in zip(keys, ingredients)
+                if query in key and not key.startswith(query)
+            )
+            result += self.rank(contained, popularity, limit - len(result))
+        return result
+
+
+ingredient_index = IngredientIndex()
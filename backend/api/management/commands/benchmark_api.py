@@ -0,0 +1,327 @@
+import json
+import statistics
+import subprocess
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timezone
+from urllib.error import HTTPError
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections
+from django.db.models import Count
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+ENDPOINTS = (
+    ('recipes', '/api/recipes/', False),
+    ('recipes_limit', '/api/recipes/?limit=50', False),
+    ('recipes_cursor', '/api/recipes/?pagination=cursor', False),
+    ('recipes_tags', '/api/recipes/?tags={tag}', False),
+    ('recipes_search', '/api/recipes/?search={word}', False),
+    ('recipes_trending',
+     '/api/recipes/?ordering=trending&pagination=cursor', False),
+    ('recipe_detail', '/api/recipes/{recipe}/', False),
+    ('recipe_similar', '/api/recipes/{recipe}/similar/', False),
+    ('ingredients_search', '/api/ingredients/?name={prefix}', False),
+    ('tags', '/api/tags/', False),
+    ('users', '/api/users/', False),
+    ('me', '/api/users/me/', True),
+    ('subscriptions', '/api/users/subscriptions/', True),
+    ('recipes_favorited', '/api/recipes/?is_favorited=1', True),
+    ('download_shopping_cart', '/api/recipes/download_shopping_cart/', True),
+)
+
+
+class Command(BaseCommand):
+    """Нагрузочный замер основных адресов API"""
+    help = ('Задержка p50/p95/p99, запросов в секунду и количество '
+            'SQL-запросов по адресам API с выводом в JSON для сравнения '
+            'между коммитами')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode',
+            choices=('client', 'wsgi'),
+            default='client',
+            help='Тестовый клиент Django или локальный WSGI-сервер',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Количество замеряемых запросов к каждому адресу',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=10,
+            help='Количество незамеряемых запросов перед замером',
+        )
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Очищать кэш перед каждым запросом',
+        )
+        parser.add_argument(
+            '--endpoints',
+            nargs='+',
+            choices=[name for name, _, _ in ENDPOINTS],
+            help='Замерять только перечисленные адреса',
+        )
+        parser.add_argument(
+            '--host',
+            default='localhost',
+            help='Заголовок Host запросов',
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для сохранения результатов в JSON',
+        )
+        parser.add_argument(
+            '--compare',
+            help='JSON предыдущего замера для сравнения',
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 2:
+            raise CommandError('--requests должен быть не меньше 2')
+        params = endpoint_params()
+        token = benchmark_token()
+        selected = options['endpoints'] or [name for name, _, _ in ENDPOINTS]
+        endpoints = [
+            (name, quote(path.format(**params), safe='/?=&'), auth)
+            for name, path, auth in ENDPOINTS if name in selected
+        ]
+        if token is None:
+            self.stderr.write('Нет пользователей: адреса с авторизацией '
+                              'пропущены')
+            endpoints = [endpoint for endpoint in endpoints
+                         if not endpoint[2]]
+        runner = (ClientRunner if options['mode'] == 'client'
+                  else WSGIRunner)(options['host'], token)
+        results = {}
+        with runner:
+            for name, path, auth in endpoints:
+                results[name] = measure(
+                    runner, path, auth,
+                    options['requests'], options['warmup'], options['cold'])
+                if results[name]['errors']:
+                    self.stderr.write(
+                        f'{name}: ответов не 200 - '
+                        f'{results[name]["errors"]}'
+                    )
+        report = {'meta': metadata(options), 'endpoints': results}
+        previous = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as source:
+                previous = json.load(source)['endpoints']
+        self.print_table(results, previous)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as target:
+                json.dump(report, target, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Результаты сохранены в {options["output"]}')
+
+    def print_table(self, results, previous=None):
+        self.stdout.write(f'{"адрес":<24}{"p50 мс":>9}{"p95 мс":>9}'
+                          f'{"p99 мс":>9}{"в с":>9}{"SQL":>7}')
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<24}{result["p50_ms"]:>9.2f}{result["p95_ms"]:>9.2f}'
+                f'{result["p99_ms"]:>9.2f}{result["rps"]:>9.1f}'
+                f'{result["queries"]:>7}'
+            )
+            before = (previous or {}).get(name)
+            if before:
+                self.stdout.write(
+                    f'{"":<24}{change(before["p50_ms"], result["p50_ms"]):>9}'
+                    f'{change(before["p95_ms"], result["p95_ms"]):>9}'
+                    f'{change(before["p99_ms"], result["p99_ms"]):>9}'
+                    f'{change(before["rps"], result["rps"]):>9}'
+                    f'{result["queries"] - before["queries"]:>+7}'
+                )
+
+
+def endpoint_params():
+    '''Значения для адресов: самый популярный рецепт, тег и слово.'''
+    recipe = Recipe.objects.order_by('-favorites_count', '-id').first()
+    tag = Tag.objects.order_by('id').first()
+    ingredient = Ingredient.objects.order_by('id').first()
+    word = recipe.text.split()[0] if recipe and recipe.text else 'суп'
+    return {
+        'recipe': recipe.id if recipe else 0,
+        'tag': tag.slug if tag else '',
+        'word': word,
+        'prefix': ingredient.name[:3] if ingredient else 'а',
+    }
+
+
+def benchmark_token():
+    '''Токен пользователя с самым большим списком покупок.'''
+    user = (User.objects.annotate(cart=Count('user_list'))
+            .order_by('-cart', 'id').first())
+    if user is None:
+        return None
+    return Token.objects.get_or_create(user=user)[0].key
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def change(before, after):
+    if not before:
+        return '-'
+    return f'{(after - before) / before:+.0%}'
+
+
+def measure(runner, path, auth, requests, warmup, cold):
+    for _ in range(warmup):
+        runner.get(path, auth)
+    timings, queries, errors = [], [], 0
+    for _ in range(requests):
+        if cold:
+            cache.clear()
+        started = time.perf_counter()
+        status, count = runner.get(path, auth)
+        timings.append(time.perf_counter() - started)
+        queries.append(count)
+        errors += status != 200
+    ordered = sorted(timings)
+    return {
+        'path': path,
+        'requests': requests,
+        'errors': errors,
+        'p50_ms': percentile(ordered, 0.50) * 1000,
+        'p95_ms': percentile(ordered, 0.95) * 1000,
+        'p99_ms': percentile(ordered, 0.99) * 1000,
+        'mean_ms': statistics.fmean(timings) * 1000,
+        'rps': len(timings) / sum(timings),
+        'queries': round(statistics.median(queries)),
+    }
+
+
+class QueryCounter:
+    """Счётчик SQL-запросов всех подключений текущего потока."""
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def counting(self):
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(self))
+            yield
+
+
+class ClientRunner:
+    """Запросы через тестовый клиент Django в текущем процессе."""
+    def __init__(self, host, token):
+        self.client = Client(HTTP_HOST=host)
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {token}'}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def get(self, path, auth):
+        counter = QueryCounter()
+        with counter.counting():
+            response = self.client.get(path, **(self.auth if auth else {}))
+            if response.streaming:
+                # Тело потокового ответа строится при чтении.
+                b''.join(response.streaming_content)
+            response.close()
+        return response.status_code, counter.count
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class WSGIRunner:
+    """
+    Запросы по HTTP к WSGI-серверу в отдельном потоке процесса:
+    замер включает разбор HTTP и сериализацию ответа.
+    """
+    def __init__(self, host, token):
+        self.host = host
+        self.token = token
+        self.last_count = 0
+
+    def __enter__(self):
+        self.server = make_server('127.0.0.1', 0, self.application,
+                                  handler_class=QuietHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+        self.thread.start()
+        self.wsgi = get_wsgi_application()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def application(self, environ, start_response):
+        counter = QueryCounter()
+        with counter.counting():
+            response = self.wsgi(environ, start_response)
+            body = b''.join(response)
+            response.close()
+        self.last_count = counter.count
+        return [body]
+
+    def get(self, path, auth):
+        headers = {'Host': self.host}
+        if auth:
+            headers['Authorization'] = f'Token {self.token}'
+        request = Request(
+            f'http://127.0.0.1:{self.server.server_port}{path}',
+            headers=headers)
+        try:
+            with urlopen(request) as response:
+                response.read()
+                status = response.status
+        except HTTPError as error:
+            status = error.code
+        return status, self.last_count
+
+
+def metadata(options):
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'database': connection.vendor,
+        'django': django.get_version(),
+        'mode': options['mode'],
+        'requests': options['requests'],
+        'warmup': options['warmup'],
+        'cold': options['cold'],
+        'users': User.objects.count(),
+        'recipes': Recipe.objects.count(),
+    }
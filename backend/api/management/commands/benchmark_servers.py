@@ -0,0 +1,201 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+HOST = '127.0.0.1'
+HOST_HEADER = 'localhost'
+
+SERVERS = {
+    'wsgi': ('backend.wsgi:application',),
+    'asgi': ('backend.asgi:application',
+             '--worker-class', 'uvicorn.workers.UvicornWorker'),
+}
+
+# Кроме чтений - действия списка рецептов: под ASGI они не должны
+# перехватываться асинхронным маршрутом detail.
+DEFAULT_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/?limit=20',
+    '/api/recipes/1/',
+    '/api/tags/',
+    '/api/ingredients/?name=мук',
+    '/api/recipes/download_shopping_cart/',
+    '/api/recipes/shopping_cart/',
+    '/api/recipes/favorite/',
+)
+
+
+class Command(BaseCommand):
+    """Сравнение производительности WSGI и ASGI"""
+    help = ('Нагрузочное сравнение чтения API под gunicorn (WSGI) '
+            'и gunicorn с uvicorn (ASGI), запросов в секунду на ядро')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--paths',
+            nargs='+',
+            default=DEFAULT_PATHS,
+            help='Адреса для нагрузки',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Количество процессов сервера, одно ядро на процесс',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=32,
+            help='Количество одновременных запросов',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=10,
+            help='Длительность замера в секундах',
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8765,
+        )
+        parser.add_argument(
+            '--token',
+            help='Токен пользователя для заголовка Authorization',
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers должен быть больше нуля')
+        if options['workers'] > 1 and not settings.CACHE_SHARED:
+            # Иначе gunicorn.conf.py остановит сервер при запуске.
+            raise CommandError(
+                'Для --workers больше 1 нужен общий кэш: задайте '
+                'CACHE_BACKEND и CACHE_LOCATION (memcached) '
+                'или запустите с --workers 1')
+        paths = [quote(path, safe='/?=&') for path in options['paths']]
+        token = options['token']
+        responses = {}
+        self.stdout.write(f'{"сервер":<8}{"запросов":>10}{"ошибок":>8}'
+                          f'{"в с":>10}{"в с на ядро":>14}')
+        for name, server_args in SERVERS.items():
+            with run_server(server_args, options['workers'],
+                            options['port']):
+                responses[name] = [
+                    asyncio.run(fetch(options['port'], path, token))
+                    for path in paths
+                ]
+                expected = {
+                    path: status
+                    for path, (status, _) in zip(paths, responses[name])
+                }
+                done, errors, elapsed = asyncio.run(load(
+                    options['port'], expected, token,
+                    options['concurrency'], options['duration']
+                ))
+            rate = done / elapsed
+            self.stdout.write(f'{name:<8}{done:>10}{errors:>8}{rate:>10.1f}'
+                              f'{rate / options["workers"]:>14.1f}')
+        mismatched = [
+            path for path, wsgi, asgi
+            in zip(options['paths'], responses['wsgi'], responses['asgi'])
+            if wsgi != asgi
+        ]
+        if mismatched:
+            raise CommandError('Ответы WSGI и ASGI различаются: '
+                               + ', '.join(mismatched))
+        self.stdout.write(self.style.SUCCESS('Ответы WSGI и ASGI совпадают'))
+
+
+@contextmanager
+def run_server(server_args, workers, port):
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', *server_args,
+         '--bind', f'{HOST}:{port}', '--workers', str(workers)],
+        cwd=settings.BASE_DIR,
+        env=os.environ.copy(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(port, process)
+        yield
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def wait_for_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError('Сервер завершился при запуске')
+        try:
+            socket.create_connection((HOST, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'Сервер не запустился за {timeout} с')
+
+
+async def fetch(port, path, token=None):
+    '''Один запрос на отдельном соединении: статус и тело ответа.'''
+    reader, writer = await asyncio.open_connection(HOST, port)
+    authorization = f'Authorization: Token {token}\r\n' if token else ''
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: {HOST_HEADER}\r\n'
+                 f'{authorization}Connection: close\r\n\r\n'.encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    if b'transfer-encoding: chunked' in head.lower():
+        body = dechunk(body)
+    return int(head.split(b' ', 2)[1]), body
+
+
+def dechunk(body):
+    '''Тело без разметки chunked: серверы делят поток по-разному.'''
+    parts = []
+    while True:
+        size, _, body = body.partition(b'\r\n')
+        size = int(size.split(b';')[0], 16)
+        if not size:
+            return b''.join(parts)
+        parts.append(body[:size])
+        body = body[size + 2:]
+
+
+async def load(port, expected, token, concurrency, duration):
+    '''
+    Нагрузка по адресам expected; ошибка - статус, отличный
+    от полученного при проверке ответов.
+    '''
+    paths = list(expected)
+    done = errors = 0
+    deadline = time.monotonic() + duration
+
+    async def client(number):
+        nonlocal done, errors
+        while time.monotonic() < deadline:
+            path = paths[(number + done) % len(paths)]
+            try:
+                status, _ = await fetch(port, path, token)
+            except OSError:
+                status = None
+            if status == expected[path]:
+                done += 1
+            else:
+                errors += 1
+
+    started = time.monotonic()
+    await asyncio.gather(*(client(number) for number in range(concurrency)))
+    return done, errors, time.monotonic() - started
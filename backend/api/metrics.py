@@ -0,0 +1,93 @@
+import asyncio
+import os
+import time
+
+from django.http import HttpResponse
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+from api.timing import current_timing
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Время обработки запроса',
+    ('route', 'method'),
+)
+RESPONSES = Counter(
+    'http_responses_total',
+    'Ответы по статусам',
+    ('route', 'method', 'status'),
+)
+DB_QUERIES = Histogram(
+    'http_request_db_queries',
+    'SQL-запросы на один запрос',
+    ('route',),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+CACHE_REQUESTS = Counter(
+    'api_cache_requests_total',
+    'Обращения к кэшам API',
+    ('cache', 'result'),
+)
+
+
+def record_cache(name, hit, count=1):
+    CACHE_REQUESTS.labels(name, 'hit' if hit else 'miss').inc(count)
+
+
+def route_name(request):
+    '''Имя маршрута вместо пути: id в адресах не раздувают метрики.'''
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route
+
+
+class MetricsMiddleware:
+    """
+    Гистограмма задержек и счётчик статусов по маршрутам и методам,
+    число SQL-запросов по данным TimingMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - started)
+        return response
+
+    def record(self, request, response, duration):
+        route = route_name(request)
+        REQUEST_LATENCY.labels(route, request.method).observe(duration)
+        RESPONSES.labels(route, request.method, response.status_code).inc()
+        timing = current_timing.get()
+        if timing is not None:
+            DB_QUERIES.labels(route).observe(len(timing.queries))
+
+
+def metrics_view(request):
+    '''
+    Метрики в текстовом формате Prometheus. При PROMETHEUS_MULTIPROC_DIR
+    собираются из файлов всех процессов gunicorn.
+    '''
+    registry = REGISTRY
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(generate_latest(registry),
+                        content_type=CONTENT_TYPE_LATEST)
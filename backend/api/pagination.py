@@ -1,4 +1,11 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
 
 
 class LimitPagination(PageNumberPagination):
@@ -6,3 +13,140 @@ class LimitPagination(PageNumberPagination):
     количества обьектов на странице по лимиту
     """
     page_size_query_param = 'limit'
+
+
+class LimitCursorPagination(CursorPagination):
+    """Курсорный пагинатор без OFFSET и COUNT(*).
+    Позиция курсора - значения всех полей сортировки, последнее
+    из которых уникально, поэтому при равных значениях первого поля
+    страница начинается с поиска по индексу, а не со смещения.
+    Общее количество объектов считается только по запросу ?count=true
+    """
+    page_size_query_param = 'limit'
+    count_query_param = 'count'
+    ordering = ('-pub_date', '-id')
+    tiebreaker = '-id'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering += (self.tiebreaker,)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ('1', 'true'):
+            self.count = queryset.count()
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, current_position = self.cursor or (0, False, None)
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(field[1:] if field.startswith('-')
+                             else f'-{field}' for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if current_position is not None:
+            queryset = self.filter_after(queryset, ordering,
+                                         current_position)
+        # Дальше - как в CursorPagination.paginate_queryset.
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following_position = len(results) > len(self.page)
+        following_position = None
+        if has_following_position:
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering)
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following_position
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position = following_position
+            self.previous_position = current_position
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def filter_after(self, queryset, ordering, position):
+        '''
+        Строки после позиции в порядке ordering:
+        (a, b) после (x, y) <=> a после x или a = x и b после y.
+        Нестрогое условие на первое поле задаёт начало поиска по индексу.
+        '''
+        try:
+            values = json.loads(position)
+            if (not isinstance(values, list)
+                    or len(values) != len(ordering)):
+                raise ValueError
+            after, equal = Q(), Q()
+            for field, value in zip(ordering, values):
+                name = field.lstrip('-')
+                lookup = 'lt' if field.startswith('-') else 'gt'
+                after |= equal & Q(**{f'{name}__{lookup}': value})
+                equal &= Q(**{name: value})
+            first = ordering[0]
+            bound = Q(**{'{}__{}e'.format(
+                first.lstrip('-'), 'lt' if first.startswith('-') else 'gt'
+            ): values[0]})
+            return queryset.filter(bound & after)
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _get_position_from_instance(self, instance, ordering):
+        return json.dumps([
+            getattr(instance, field.lstrip('-')) for field in ordering
+        ], default=str, separators=(',', ':'))
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['previous'] = self.get_previous_link()
+        response['results'] = data
+        return Response(response)
+
+
+class FeedPagination(LimitPagination):
+    """Постраничный пагинатор, который переключается на курсорный
+    при ?pagination=cursor или при наличии параметра cursor.
+    Курсор следует явной сортировке запроса, если она задана фильтром.
+    """
+    mode_query_param = 'pagination'
+    cursor_ordering = LimitCursorPagination.ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if (request.query_params.get(self.mode_query_param) == 'cursor'
+                or LimitCursorPagination.cursor_query_param
+                in request.query_params):
+            self.cursor_paginator = LimitCursorPagination()
+            self.cursor_paginator.ordering = self.get_cursor_ordering(
+                queryset)
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_cursor_ordering(self, queryset):
+        ordering = queryset.query.order_by
+        if ordering and all(isinstance(field, str) for field in ordering):
+            return tuple(ordering)
+        return self.cursor_ordering
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class SubscriptionPagination(FeedPagination):
+    """Пагинатор подписок: курсор по уникальному username"""
+    cursor_ordering = ('username',)
@@ -0,0 +1,140 @@
+from collections import defaultdict
+
+from django.conf import settings
+
+from api.utils import limited_recipes
+from recipes.images import RENDITION_FORMATS, SUMMARY_RENDITION, rendition_path
+from recipes.models import Recipe, SumIngredients
+from users.models import User
+
+# Быстрые представления только для чтения из строк .values():
+# результат совпадает с RecipeGetSerializer, SummaryRecipesSerializer
+# и SubscriptionSerializer без обхода полей DRF на каждый объект.
+
+SUMMARY_FIELDS = ('id', 'name', 'image', 'renditions', 'cooking_time')
+AUTHOR_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+
+
+def url_builder(request=None):
+    '''Ссылка на файл изображения рецепта, абсолютная при наличии запроса.'''
+    storage = Recipe._meta.get_field('image').storage
+    if request is None:
+        return storage.url
+    # Для пути от корня сайта build_absolute_uri лишь добавляет
+    # схему и хост: они вычисляются один раз на запрос.
+    origin = request.build_absolute_uri('/')[:-1]
+
+    def build_url(name):
+        url = storage.url(name)
+        if url.startswith('/') and not url.startswith('//'):
+            return origin + url
+        return request.build_absolute_uri(url)
+    return build_url
+
+
+def image_fields(row, build_url):
+    '''Поля image и image_renditions как в ImageRenditionsMixin.'''
+    name = row['image']
+    if not name:
+        return None, None
+    renditions = row['renditions'] or {}
+    return build_url(name), {
+        rendition: {
+            extension: build_url(rendition_path(name, renditions, rendition,
+                                                extension))
+            for extension in RENDITION_FORMATS
+        }
+        for rendition in settings.IMAGE_RENDITIONS
+    }
+
+
+def recipe_summary(row, build_url):
+    name = row['image']
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'image': (build_url(rendition_path(name, row['renditions'] or {},
+                                           *SUMMARY_RENDITION))
+                  if name else None),
+        'cooking_time': row['cooking_time'],
+    }
+
+
+def recipe_summaries(queryset, request=None):
+    '''Краткие рецепты в порядке queryset одним запросом.'''
+    build_url = url_builder(request)
+    return [recipe_summary(row, build_url)
+            for row in queryset.values(*SUMMARY_FIELDS)]
+
+
+def recipe_details(ids, request=None):
+    '''
+    Полные рецепты по id четырьмя запросами: рецепты, теги, авторы,
+    ингредиенты. Флаги пользователя ложны.
+    '''
+    build_url = url_builder(request)
+    rows = list(Recipe.objects.filter(id__in=ids).values(
+        'author_id', 'text', *SUMMARY_FIELDS))
+    tags = defaultdict(list)
+    for recipe_id, *tag in (Recipe.tags.through.objects
+                            .filter(recipe_id__in=ids).order_by('-tag_id')
+                            .values_list('recipe_id', 'tag_id', 'tag__name',
+                                         'tag__color', 'tag__slug')):
+        tags[recipe_id].append(dict(zip(('id', 'name', 'color', 'slug'),
+                                        tag)))
+    authors = {
+        author['id']: author
+        for author in User.objects.filter(
+            id__in={row['author_id'] for row in rows}
+        ).values(*AUTHOR_FIELDS)
+    }
+    ingredients = defaultdict(list)
+    for recipe_id, *ingredient in (
+            SumIngredients.objects.filter(recipe_id__in=ids)
+            .values_list('recipe_id', 'ingredient_id', 'ingredient__name',
+                         'ingredient__measurement_unit', 'amount')):
+        ingredients[recipe_id].append(dict(zip(
+            ('id', 'name', 'measurement_unit', 'amount'), ingredient)))
+    details = {}
+    for row in rows:
+        image, renditions = image_fields(row, build_url)
+        details[row['id']] = {
+            'id': row['id'],
+            'tags': tags[row['id']],
+            'author': ({**authors[row['author_id']], 'is_subscribed': False}
+                       if row['author_id'] is not None else None),
+            'ingredients': ingredients[row['id']],
+            'is_favorited': False,
+            'is_in_shopping_cart': False,
+            'name': row['name'],
+            'image': image,
+            'image_renditions': renditions,
+            'text': row['text'],
+            'cooking_time': row['cooking_time'],
+        }
+    return details
+
+
+def subscriptions(authors, limit):
+    '''
+    Авторы с флагом is_subscribed и не более limit рецептами каждого.
+    Ссылки в рецептах относительные, как у SubscriptionSerializer.
+    '''
+    build_url = url_builder()
+    recipes = defaultdict(list)
+    for row in limited_recipes([author.id for author in authors],
+                               limit).values('author_id', *SUMMARY_FIELDS):
+        recipes[row['author_id']].append(recipe_summary(row, build_url))
+    return [
+        {
+            'email': author.email,
+            'id': author.id,
+            'username': author.username,
+            'first_name': author.first_name,
+            'last_name': author.last_name,
+            'is_subscribed': author.is_subscribed,
+            'recipes': recipes[author.id],
+            'recipes_count': author.recipes_count,
+        }
+        for author in authors
+    ]
@@ -5,18 +5,64 @@ from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
-from api.utils import ingredient_list_for_recipe
+from api.utils import (annotate_is_subscribed, change_counter,
+                       get_recipes_limit, ingredient_list_for_recipe,
+                       prefetch_limited_recipes, update_ingredient_list)
+from recipes.images import (RENDITION_FORMATS, SUMMARY_RENDITION,
+                            rendition_path, schedule_renditions)
 from recipes.models import (Favorite, Ingredient, Recipe, ShoppingList,
                             SumIngredients, Tag)
+from recipes.signals import recipe_ingredients_changed
 from users.models import Follow, User
 
 
+class ImageRenditionsMixin(serializers.ModelSerializer):
+    """
+    Ссылки на уменьшенные копии изображения рецепта.
+    Пока копии не готовы, вместо них отдаётся исходное изображение.
+    """
+    image_renditions = serializers.SerializerMethodField()
+
+    def get_image_renditions(self, obj):
+        if not obj.image:
+            return None
+        request = self.context.get('request')
+        storage = obj.image.storage
+
+        def build_url(name):
+            url = storage.url(name)
+            return request.build_absolute_uri(url) if request else url
+
+        return {
+            name: {
+                extension: build_url(rendition_path(
+                    obj.image.name, obj.renditions, name, extension))
+                for extension in RENDITION_FORMATS
+            }
+            for name in settings.IMAGE_RENDITIONS
+        }
+
+
 class SummaryRecipesSerializer(serializers.ModelSerializer):
-    """Краткая информация о рецепте"""
+    """
+    Краткая информация о рецепте.
+    Вместо исходного изображения - миниатюра, пока она не готова -
+    исходное изображение.
+    """
+    image = serializers.SerializerMethodField()
+
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
-        read_only_fields = ('id', 'name', 'image', 'cooking_time')
+        read_only_fields = ('id', 'name', 'cooking_time')
+
+    def get_image(self, obj):
+        if not obj.image:
+            return None
+        url = obj.image.storage.url(rendition_path(
+            obj.image.name, obj.renditions, *SUMMARY_RENDITION))
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
 
 
 class SubscribeMixin(serializers.ModelSerializer):
@@ -26,14 +72,16 @@ class SubscribeMixin(serializers.ModelSerializer):
     recipes_count = serializers.SerializerMethodField()
 
     def get_recipes_count(self, obj):
-        return obj.user.count()
+        return obj.recipes_count
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.query_params.get('recipes_limit', None)
-        recipes = obj.user.all()
-        if limit:
-            recipes = recipes[:int(limit)]
+        if hasattr(obj, 'limited_recipes'):
+            recipes = obj.limited_recipes
+        else:
+            limit = get_recipes_limit(self.context['request'])
+            recipes = obj.user.all()
+            if limit is not None:
+                recipes = recipes[:limit]
         serializer = SummaryRecipesSerializer(
             recipes,
             many=True,
@@ -42,6 +90,8 @@ class SubscribeMixin(serializers.ModelSerializer):
         return serializer.data
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request_user = self.context['request'].user.id
         return obj.following.filter(user=request_user).exists()
 
@@ -111,8 +161,12 @@ class SubscribeSerializer(serializers.ModelSerializer):
         return data
 
     def to_representation(self, instance):
-        return SubscriptionSerializer(
-            instance.following, context=self.context).data
+        request = self.context['request']
+        author = annotate_is_subscribed(
+            User.objects.filter(id=instance.following_id), request.user
+        ).get()
+        prefetch_limited_recipes([author], get_recipes_limit(request))
+        return SubscriptionSerializer(author, context=self.context).data
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -156,7 +210,7 @@ class SumIngredientsSerializer(serializers.ModelSerializer):
         fields = ('id', 'amount')
 
 
-class RecipeGetSerializer(serializers.ModelSerializer):
+class RecipeGetSerializer(ImageRenditionsMixin):
     """Сериализатор для получения списка рецептов."""
     tags = TagSerializer(many=True, read_only=True)
     author = UserListSerializer(read_only=True)
@@ -171,9 +225,11 @@ class RecipeGetSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients',
                   'is_favorited', 'is_in_shopping_cart', 'name',
-                  'image', 'text', 'cooking_time')
+                  'image', 'image_renditions', 'text', 'cooking_time')
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context['request']
         return (
             request and request.user.is_authenticated
@@ -181,6 +237,8 @@ class RecipeGetSerializer(serializers.ModelSerializer):
         )
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context['request']
         return (
             request and request.user.is_authenticated
@@ -224,6 +282,13 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 'Вы пытаетесь добавить в рецепт два одинаковых ингредиента'
             )
+        unknown = (set(ingredients_list)
+                   - Ingredient.objects.in_bulk(ingredients_list).keys())
+        if unknown:
+            raise serializers.ValidationError({
+                'ingredients': 'Ингредиенты не найдены: {}'.format(
+                    ', '.join(map(str, sorted(unknown))))
+            })
         return obj
 
     @transaction.atomic
@@ -235,18 +300,29 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             author=request.user, **validated_data)
         recipe.tags.set(tags)
         ingredient_list_for_recipe(ingredients, recipe)
+        recipe_ingredients_changed.send(sender=Recipe, recipe=recipe)
+        change_counter(User.objects.filter(id=request.user.id),
+                       'recipes_count', 1)
+        schedule_renditions(recipe)
         return recipe
 
     @transaction.atomic
     def update(self, instance, validated_data):
         ingredients = validated_data.pop('recipes')
         tags = validated_data.pop('tags')
-        instance.tags.clear()
         instance.tags.set(tags)
-        SumIngredients.objects.filter(recipe=instance).delete()
-        super().update(instance, validated_data)
-        ingredient_list_for_recipe(ingredients, instance)
-        instance.save()
+        if update_ingredient_list(ingredients, instance):
+            recipe_ingredients_changed.send(sender=Recipe, recipe=instance)
+        changed_fields = [
+            field for field, value in validated_data.items()
+            if getattr(instance, field) != value
+        ]
+        for field in changed_fields:
+            setattr(instance, field, validated_data[field])
+        if changed_fields:
+            instance.save(update_fields=changed_fields)
+        if 'image' in validated_data:
+            schedule_renditions(instance)
         return instance
 
 
@@ -290,3 +366,15 @@ class ShoppingListSerializer(serializers.ModelSerializer):
             instance.recipe_id,
             context={'request': request}
         ).data
+
+
+class BatchIdsSerializer(serializers.Serializer):
+    """Список id для пакетных операций."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BATCH_MAX_SIZE,
+    )
+
+    def validate_ids(self, value):
+        return list(dict.fromkeys(value))
@@ -0,0 +1,106 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import auth_scope
+from api.cache import author_scope, bump_generation, recipe_scope
+from recipes.models import (Favorite, Ingredient, Recipe, ShoppingList,
+                            SumIngredients, Tag)
+from recipes.signals import recipe_ingredients_changed
+from users.models import Follow, User
+
+
+def invalidate(*scopes):
+    '''Смена поколений после коммита, чтобы кэш не заполнился
+    данными из ещё не завершённой транзакции.'''
+    transaction.on_commit(lambda: bump_generation(*scopes))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=SumIngredients)
+@receiver(post_delete, sender=SumIngredients)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(recipe_ingredients_changed, sender=Recipe)
+def invalidate_recipes(**kwargs):
+    invalidate('recipes')
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_card(instance, **kwargs):
+    invalidate(recipe_scope(instance.id))
+
+
+@receiver(post_save, sender=SumIngredients)
+@receiver(post_delete, sender=SumIngredients)
+def invalidate_ingredients_card(instance, **kwargs):
+    invalidate(recipe_scope(instance.recipe_id))
+
+
+@receiver(recipe_ingredients_changed, sender=Recipe)
+def invalidate_bulk_ingredients_card(recipe, **kwargs):
+    invalidate(recipe_scope(recipe.id))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_tags_card(instance, action, reverse, pk_set, **kwargs):
+    """Со стороны тега при очистке связей рецепты неизвестны:
+    сбрасываются карточки всех рецептов."""
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate(recipe_scope(instance.id))
+    elif pk_set:
+        invalidate(*map(recipe_scope, pk_set))
+    else:
+        invalidate('tags')
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tags(**kwargs):
+    invalidate('tags', 'recipes')
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredients(**kwargs):
+    invalidate('ingredients', 'recipes')
+
+
+@receiver(post_save, sender=User)
+def invalidate_authors(instance, update_fields=None, **kwargs):
+    """Вход пользователя обновляет только last_login, данные автора
+    в рецептах при этом не меняются."""
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    invalidate('recipes', author_scope(instance.id))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def revoke_user_tokens(instance, update_fields=None, **kwargs):
+    """Смена пароля, деактивация и удаление пользователя
+    отзывают кэшированные токены."""
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    invalidate(auth_scope(instance.id))
+
+
+@receiver(post_delete, sender=Token)
+def revoke_token(instance, **kwargs):
+    """Выход через djoser удаляет токен."""
+    invalidate(auth_scope(instance.user_id))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingList)
+@receiver(post_delete, sender=ShoppingList)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_user_flags(instance, **kwargs):
+    """Флаги избранного, списка покупок и подписок пользователя."""
+    invalidate(f'user-{instance.user_id}')
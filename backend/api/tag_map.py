@@ -0,0 +1,31 @@
+import threading
+
+from api.cache import get_generations
+from recipes.models import Tag
+
+
+class TagMap:
+    """
+    Слаг -> id тегов в памяти процесса.
+    Перестраивается при смене поколения кэша тегов.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.generation = None
+        self.ids = {}
+
+    def get(self):
+        generation = get_generations(('tags',))[0]
+        if generation != self.generation:
+            with self.lock:
+                if generation != self.generation:
+                    self.ids = dict(Tag.objects.values_list('slug', 'id'))
+                    self.generation = generation
+        return self.ids
+
+
+tag_map = TagMap()
+
+
+def tag_choices():
+    return [(slug, slug) for slug in tag_map.get()]
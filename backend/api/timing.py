@@ -0,0 +1,194 @@
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+PLACEHOLDER_LISTS = re.compile(r'%s(?:\s*,\s*%s)+')
+
+current_timing = ContextVar('current_timing', default=None)
+
+
+def normalize_sql(sql):
+    '''SQL без значений: одинаковые запросы с разными id совпадают.'''
+    sql = PLACEHOLDER_LISTS.sub('%s, ...', LITERALS.sub('%s', sql))
+    return ' '.join(sql.split())
+
+
+class RequestTiming:
+    """
+    Длительности этапов запроса и выполненные SQL-запросы.
+    Этапы могут пересекаться: SQL внутри сериализации учитывается
+    и в db, и в serialize.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = None
+        self.durations = defaultdict(float)
+        self.queries = []
+
+    def add(self, name, duration):
+        self.durations[name] += duration
+
+    def add_query(self, sql, duration):
+        self.queries.append((sql, duration))
+        self.add('db', duration)
+
+    def stop(self):
+        self.total = time.perf_counter() - self.started
+
+    def header(self):
+        metrics = []
+        for name, duration in self.durations.items():
+            metric = f'{name};dur={duration * 1000:.2f}'
+            if name == 'db':
+                metric += f';desc="{len(self.queries)} SQL"'
+            metrics.append(metric)
+        metrics.append(f'total;dur={self.total * 1000:.2f}')
+        return ', '.join(metrics)
+
+    def statements(self):
+        '''Нормализованные запросы по убыванию числа повторов.'''
+        grouped = defaultdict(lambda: [0, 0.0])
+        for sql, duration in self.queries:
+            entry = grouped[normalize_sql(sql)]
+            entry[0] += 1
+            entry[1] += duration
+        return [
+            {'sql': sql, 'count': count, 'ms': round(duration * 1000, 2)}
+            for sql, (count, duration) in sorted(
+                grouped.items(), key=lambda item: (-item[1][0],
+                                                   -item[1][1]))
+        ]
+
+
+@contextmanager
+def timed(name):
+    '''Учёт длительности блока в этапе name текущего запроса.'''
+    timing = current_timing.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, time.perf_counter() - started)
+
+
+def record_query(execute, sql, params, many, context):
+    timing = current_timing.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.add_query(sql, time.perf_counter() - started)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    '''Учёт SQL каждого нового подключения, в том числе в потоках ASGI.'''
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def timed_serializer(serializer):
+    '''Учёт времени сериализации корневого сериализатора.'''
+    serializer.to_representation = timed('serialize')(
+        serializer.to_representation)
+    return serializer
+
+
+class TimingMixin:
+    """
+    Этапы DRF в Server-Timing: аутентификация, проверка прав,
+    сериализация и рендеринг ответа.
+    """
+    def perform_authentication(self, request):
+        with timed('auth'):
+            super().perform_authentication(request)
+
+    def check_permissions(self, request):
+        with timed('permissions'):
+            super().check_permissions(request)
+
+    def check_object_permissions(self, request, obj):
+        with timed('permissions'):
+            super().check_object_permissions(request, obj)
+
+    def get_serializer(self, *args, **kwargs):
+        return timed_serializer(super().get_serializer(*args, **kwargs))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs)
+        renderer = getattr(response, 'accepted_renderer', None)
+        if renderer is not None:
+            renderer.render = timed('render')(renderer.render)
+        return response
+
+
+class TimingMiddleware:
+    """
+    Заголовок Server-Timing для персонала или при SERVER_TIMING
+    и журнал запросов дольше SLOW_REQUEST_MS с повторами SQL.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        self.finish(request, response, timing)
+        return response
+
+    async def __acall__(self, request):
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        await sync_to_async(self.finish)(request, response, timing)
+        return response
+
+    def finish(self, request, response, timing):
+        timing.stop()
+        user = getattr(request, 'user', None)
+        if settings.SERVER_TIMING or getattr(user, 'is_staff', False):
+            response['Server-Timing'] = timing.header()
+        if timing.total * 1000 >= settings.SLOW_REQUEST_MS:
+            logger.warning(json.dumps({
+                'method': request.method,
+                'path': request.get_full_path(),
+                'status': response.status_code,
+                'total_ms': round(timing.total * 1000, 2),
+                **{
+                    f'{name}_ms': round(duration * 1000, 2)
+                    for name, duration in timing.durations.items()
+                },
+                'queries': len(timing.queries),
+                'statements': timing.statements()[
+                    :settings.SLOW_REQUEST_STATEMENTS],
+            }, ensure_ascii=False))
@@ -1,20 +1,207 @@
-from django.shortcuts import get_object_or_404
+from django.db.models import (BooleanField, Exists, F, OuterRef, Prefetch,
+                              Value, Window, prefetch_related_objects)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
 
-from recipes.models import Ingredient, SumIngredients
+from api.signals import invalidate
+from recipes.cart_totals import lock_recipes, propagate_recipe_changes
+from recipes.models import Favorite, Recipe, ShoppingList, SumIngredients
+from users.models import Follow, User
 
 
 def ingredient_list_for_recipe(ingredients, recipe):
     '''Создание списка ингредиентов для рецепта.'''
-    ingredient_list = []
-    for ingredient in ingredients:
-        current_ingredient = get_object_or_404(
-            Ingredient, id=ingredient.get('id'))
-        amount = ingredient.get('amount')
-        ingredient_list.append(
-            SumIngredients(
-                recipe=recipe,
-                ingredient=current_ingredient,
-                amount=amount
-            )
+    SumIngredients.objects.bulk_create([
+        SumIngredients(
+            recipe=recipe,
+            ingredient_id=ingredient.get('id'),
+            amount=ingredient.get('amount')
         )
-    SumIngredients.objects.bulk_create(ingredient_list)
+        for ingredient in ingredients
+    ])
+
+
+def update_ingredient_list(ingredients, recipe):
+    '''
+    Обновление списка ингредиентов рецепта только по изменившимся строкам.
+    Изменения переносятся в итоги списков покупок с этим рецептом.
+    Возвращает True, если состав рецепта изменился.
+    '''
+    lock_recipes([recipe.id])
+    current = {
+        row.ingredient_id: row
+        for row in SumIngredients.objects.filter(recipe=recipe)
+    }
+    amounts = {
+        ingredient.get('id'): ingredient.get('amount')
+        for ingredient in ingredients
+    }
+    deltas = {}
+    removed = current.keys() - amounts.keys()
+    if removed:
+        SumIngredients.objects.filter(
+            recipe=recipe, ingredient_id__in=removed).delete()
+        deltas.update((ingredient_id, -current[ingredient_id].amount)
+                      for ingredient_id in removed)
+    changed = []
+    for ingredient_id, row in current.items():
+        if ingredient_id in amounts and row.amount != amounts[ingredient_id]:
+            deltas[ingredient_id] = amounts[ingredient_id] - row.amount
+            row.amount = amounts[ingredient_id]
+            changed.append(row)
+    SumIngredients.objects.bulk_update(changed, ['amount'])
+    added = [
+        {'id': ingredient_id, 'amount': amount}
+        for ingredient_id, amount in amounts.items()
+        if ingredient_id not in current
+    ]
+    ingredient_list_for_recipe(added, recipe)
+    deltas.update((ingredient['id'], ingredient['amount'])
+                  for ingredient in added)
+    propagate_recipe_changes(recipe.id, deltas)
+    return bool(deltas)
+
+
+def annotate_is_subscribed(queryset, user):
+    '''Флаг подписки текущего пользователя на каждого автора.'''
+    if not user.is_authenticated:
+        return queryset.annotate(
+            is_subscribed=Value(False, output_field=BooleanField()))
+    return queryset.annotate(is_subscribed=Exists(
+        Follow.objects.filter(user=user, following=OuterRef('pk'))
+    ))
+
+
+def annotate_recipe_flags(queryset, user):
+    '''Флаги избранного и списка покупок для каждого рецепта.'''
+    if not user.is_authenticated:
+        false = Value(False, output_field=BooleanField())
+        return queryset.annotate(is_favorited=false,
+                                 is_in_shopping_cart=false)
+    return queryset.annotate(
+        is_favorited=Exists(
+            Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+        ),
+        is_in_shopping_cart=Exists(
+            ShoppingList.objects.filter(user=user, recipe_id=OuterRef('pk'))
+        ),
+    )
+
+
+def change_counter(queryset, field, delta):
+    '''Атомарное изменение денормализованного счётчика.'''
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def lock_user(user):
+    '''
+    Блокировка строки пользователя до конца транзакции. Изменения
+    избранного, списка покупок и подписок одного пользователя идут
+    по очереди: прочитанные связи не меняются до записи, и счётчики
+    не считают чужую вставку или удаление своими.
+    '''
+    list(User.objects.select_for_update().filter(pk=user.pk)
+         .values_list('pk', flat=True))
+
+
+def batch_add(relation, target_field, user, ids, targets, counter,
+              invalid=None):
+    '''
+    Добавление связей пользователя с объектами targets одним bulk_create.
+    Статус для каждого id: created, exists, not_found или invalid.
+    Вызывается в транзакции после lock_user.
+    '''
+    invalid = invalid or {}
+    found = set(targets.filter(id__in=ids).values_list('id', flat=True))
+    existing = set(
+        relation.objects.filter(user=user, **{f'{target_field}__in': ids})
+        .values_list(target_field, flat=True)
+    )
+    results, created = [], []
+    for target_id in ids:
+        if target_id not in found:
+            results.append({'id': target_id, 'status': 'not_found'})
+        elif target_id in invalid:
+            results.append({'id': target_id, 'status': 'invalid',
+                            'errors': invalid[target_id]})
+        elif target_id in existing:
+            results.append({'id': target_id, 'status': 'exists'})
+        else:
+            results.append({'id': target_id, 'status': 'created'})
+            created.append(target_id)
+    attname = relation._meta.get_field(target_field).attname
+    relation.objects.bulk_create(
+        [relation(user=user, **{attname: target_id}) for target_id in created],
+        ignore_conflicts=True
+    )
+    change_counter(targets.filter(id__in=created), counter, 1)
+    # bulk_create не отправляет post_save.
+    invalidate(f'user-{user.id}')
+    return results
+
+
+def batch_remove(relation, target_field, user, ids, targets, counter):
+    '''
+    Удаление связей пользователя одним отфильтрованным DELETE.
+    Статус для каждого id: deleted или not_found.
+    Вызывается в транзакции после lock_user.
+    '''
+    links = relation.objects.filter(user=user,
+                                    **{f'{target_field}__in': ids})
+    existing = set(links.values_list(target_field, flat=True))
+    links.delete()
+    change_counter(targets.filter(id__in=existing), counter, -1)
+    return [
+        {'id': target_id,
+         'status': 'deleted' if target_id in existing else 'not_found'}
+        for target_id in ids
+    ]
+
+
+def get_recipes_limit(request):
+    '''Значение параметра recipes_limit или None, если он не задан.'''
+    try:
+        return max(int(request.query_params['recipes_limit']), 0)
+    except (KeyError, ValueError):
+        return None
+
+
+def limited_recipes(author_ids, limit):
+    '''
+    Не более limit последних рецептов каждого автора
+    одним запросом с ROW_NUMBER() OVER (PARTITION BY author).
+    '''
+    recipes = Recipe.objects.filter(author__in=author_ids)
+    if limit is None:
+        return recipes
+    ranked = (
+        recipes
+        .annotate(row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('author')],
+            order_by=[F('pub_date').desc(), F('id').desc()],
+        ))
+        .order_by()
+        .values('id', 'row_number')
+    )
+    sql, params = ranked.query.sql_with_params()
+    return recipes.filter(id__in=RawSQL(
+        f'SELECT ranked.id FROM ({sql}) ranked '
+        f'WHERE ranked.row_number <= %s',
+        (*params, limit)
+    ))
+
+
+def prefetch_limited_recipes(authors, limit):
+    '''
+    Загрузка не более limit последних рецептов каждого автора.
+    Рецепты сохраняются в атрибут limited_recipes.
+    '''
+    recipes = limited_recipes([author.id for author in authors], limit)
+    prefetch_related_objects(
+        authors,
+        Prefetch('user', queryset=recipes, to_attr='limited_recipes')
+    )
+    return authors
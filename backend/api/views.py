@@ -1,28 +1,64 @@
 from django.conf import settings
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as DjoserViewSet
-from rest_framework import filters, status, viewsets
+from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
+from api.cache import AnonymousCacheMixin, ConditionalGetMixin
+from api.cards import PAGE_FIELDS, RecipeCardSerializer
+from api.exports import EXPORT_RENDERERS, IgnoreFormatNegotiation
 from api.filters import RecipeFilter
-from api.pagination import LimitPagination
+from api.ingredient_index import ingredient_index
+from api.pagination import (FeedPagination, LimitPagination,
+                            SubscriptionPagination)
 from api.permissions import CurrentUserOrAdminOrReadOnly
-from api.serializers import (FavoriteSerializer, IngredientSerializer,
-                             RecipeCreateSerializer, RecipeGetSerializer,
+from api.representations import recipe_summaries, subscriptions
+from api.serializers import (BatchIdsSerializer, FavoriteSerializer,
+                             IngredientSerializer, RecipeCreateSerializer,
                              ShoppingListSerializer, SubscribeSerializer,
-                             SubscriptionSerializer, TagSerializer,
-                             UserListSerializer)
-from recipes.models import (Favorite, Ingredient, Recipe, ShoppingList,
-                            SumIngredients, Tag)
+                             TagSerializer, UserListSerializer)
+from api.timing import TimingMixin, timed, timed_serializer
+from api.utils import (annotate_is_subscribed, batch_add, batch_remove,
+                       change_counter, get_recipes_limit, lock_user)
+from recipes.cart_totals import (change_cart_totals, lock_recipes,
+                                 propagate_recipe_changes, recipe_amounts)
+from recipes.models import (CartTotal, Favorite, Ingredient, Recipe,
+                            ShoppingList, Tag)
 from users.models import Follow, User
 
 
-class UserViewSet(DjoserViewSet):
+class BatchRelationMixin:
+    """Пакетные POST и DELETE связей пользователя с объектами."""
+    def batch(self, request, relation, target_field, targets, counter,
+              invalid=None, on_change=None):
+        '''on_change(user_id, ids, знак) получает добавленные (+1)
+        или удалённые (-1) id в той же транзакции.'''
+        serializer = BatchIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        lock_user(request.user)
+        if request.method == 'POST':
+            results = batch_add(relation, target_field, request.user, ids,
+                                targets, counter, invalid)
+        else:
+            results = batch_remove(relation, target_field, request.user,
+                                   ids, targets, counter)
+        changed = [result['id'] for result in results
+                   if result['status'] in ('created', 'deleted')]
+        if on_change is not None and changed:
+            on_change(request.user.id, changed,
+                      1 if request.method == 'POST' else -1)
+        return Response({'results': results})
+
+
+class UserViewSet(TimingMixin, BatchRelationMixin, DjoserViewSet):
     """
     Регистрация, авторизация, смена пароля, список пользователей,
     профиль пользователя, свой профиль /me,
@@ -32,30 +68,38 @@ class UserViewSet(DjoserViewSet):
     permission_classes = (AllowAny,)
     pagination_class = LimitPagination
 
+    def get_queryset(self):
+        return annotate_is_subscribed(super().get_queryset(),
+                                      self.request.user)
+
     @action(detail=False, methods=['GET'],
             pagination_class=None,
             permission_classes=(IsAuthenticated,))
     def me(self, request):
-        serializer = UserListSerializer(
-            request.user, context={'request': request})
+        serializer = timed_serializer(UserListSerializer(
+            request.user, context={'request': request}))
         return Response(serializer.data,
                         status=status.HTTP_200_OK)
 
     @action(detail=False,
+            pagination_class=SubscriptionPagination,
             permission_classes=(IsAuthenticated,))
     def subscriptions(self, request):
-        queryset = User.objects.filter(following__user=request.user)
-        serializer = SubscriptionSerializer(
-            self.paginate_queryset(queryset),
-            many=True,
-            context={'request': request})
-        return self.get_paginated_response(serializer.data)
+        queryset = annotate_is_subscribed(
+            User.objects.filter(following__user=request.user), request.user)
+        authors = self.paginate_queryset(queryset)
+        with timed('serialize'):
+            data = subscriptions(authors, get_recipes_limit(request))
+        return self.get_paginated_response(data)
 
     @action(detail=True,
             methods=['POST', 'DELETE'],
             permission_classes=(IsAuthenticated,))
+    @transaction.atomic
     def subscribe(self, request, id):
         author = get_object_or_404(User, id=id)
+        lock_user(request.user)
+        authors = User.objects.filter(id=author.id)
         if request.method == 'POST':
             serializer = SubscribeSerializer(
                 context={'request': request},
@@ -64,6 +108,7 @@ class UserViewSet(DjoserViewSet):
             )
             serializer.is_valid(raise_exception=True)
             serializer.save()
+            change_counter(authors, 'followers_count', 1)
             return Response(serializer.data,
                             status=status.HTTP_201_CREATED)
 
@@ -74,113 +119,216 @@ class UserViewSet(DjoserViewSet):
                     status=status.HTTP_400_BAD_REQUEST)
             get_object_or_404(Follow, user=request.user,
                               following=id).delete()
+            change_counter(authors, 'followers_count', -1)
             return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False,
+            url_path='subscribe',
+            methods=['POST', 'DELETE'],
+            permission_classes=(IsAuthenticated,))
+    @transaction.atomic
+    def subscribe_batch(self, request):
+        '''Пакетная подписка и отписка: {"ids": [...]}.'''
+        return self.batch(
+            request, Follow, 'following', User.objects.all(),
+            'followers_count',
+            invalid={request.user.id: 'Нельзя подписаться на самого себя.'}
+        )
+
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(TimingMixin, ConditionalGetMixin, AnonymousCacheMixin,
+                 viewsets.ReadOnlyModelViewSet):
     """Получение информации о тегах."""
+    cache_scopes = ('tags',)
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny, )
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(TimingMixin, ConditionalGetMixin,
+                        AnonymousCacheMixin, viewsets.ReadOnlyModelViewSet):
     """Получение информации об ингредиентах."""
+    cache_scopes = ('ingredients',)
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (AllowAny, )
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ('^name',)
     pagination_class = None
 
+    def filter_queryset(self, queryset):
+        name = self.request.query_params.get(api_settings.SEARCH_PARAM)
+        if self.action != 'list' or not name:
+            return queryset
+        try:
+            limit = min(int(self.request.query_params['limit']),
+                        settings.INGREDIENT_SEARCH_MAX_LIMIT)
+        except (KeyError, ValueError):
+            limit = settings.INGREDIENT_SEARCH_LIMIT
+        return ingredient_index.search(name, max(limit, 1))
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(TimingMixin, ConditionalGetMixin, AnonymousCacheMixin,
+                    BatchRelationMixin, viewsets.ModelViewSet):
     """Представление для рецептов"""
+    cache_scopes = ('recipes',)
     queryset = Recipe.objects.all()
     permission_classes = (CurrentUserOrAdminOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
-    pagination_class = LimitPagination
+    pagination_class = FeedPagination
     http_method_names = ['get', 'post', 'patch', 'delete']
 
+    def get_queryset(self):
+        if self.action not in ('list', 'retrieve'):
+            return Recipe.objects.all()
+        return Recipe.objects.only(*PAGE_FIELDS)
+
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
-            return RecipeGetSerializer
+            return RecipeCardSerializer
         return RecipeCreateSerializer
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        author_id = instance.author_id
+        lock_recipes([instance.id])
+        propagate_recipe_changes(instance.id, {
+            ingredient: -amount
+            for ingredient, amount in recipe_amounts([instance.id]).items()
+        })
+        instance.delete()
+        change_counter(User.objects.filter(id=author_id), 'recipes_count', -1)
+
     @action(detail=True,
             permission_classes=(IsAuthenticated,),
             queryset=Favorite.objects.all(),
             pagination_class=None,
             methods=['POST', 'DELETE']
             )
+    @transaction.atomic
     def favorite(self, request, pk):
         recipe = get_object_or_404(Recipe, id=pk)
+        lock_user(request.user)
+        recipes = Recipe.objects.filter(id=recipe.id)
         if request.method == 'POST':
             serializer = FavoriteSerializer(
-                recipe,
                 data={'user': request.user.id,
                       'recipe': pk},
                 context={'request': request}
             )
             serializer.is_valid(raise_exception=True)
             serializer.save()
-            Favorite.objects.create(user=request.user, recipe=recipe)
+            change_counter(recipes, 'favorites_count', 1)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         if request.method == 'DELETE':
             get_object_or_404(
                 Favorite, user=request.user, recipe=recipe
             ).delete()
+            change_counter(recipes, 'favorites_count', -1)
             return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=True, methods=['POST', 'DELETE'],
             permission_classes=(IsAuthenticated,),
             pagination_class=None
             )
+    @transaction.atomic
     def shopping_cart(self, request, pk):
         recipe = get_object_or_404(Recipe, id=pk)
+        lock_user(request.user)
+        recipes = Recipe.objects.filter(id=recipe.id)
         if request.method == 'POST':
             serializer = ShoppingListSerializer(
-                recipe,
                 data={'user': request.user.id,
                       'recipe_id': pk},
                 context={'request': request}
             )
             serializer.is_valid(raise_exception=True)
             serializer.save()
-            ShoppingList.objects.create(
-                user=request.user,
-                recipe_id=recipe
-            )
+            change_counter(recipes, 'shopping_cart_count', 1)
+            change_cart_totals(request.user.id, [recipe.id], 1)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         if request.method == 'DELETE':
             get_object_or_404(
                 ShoppingList, user=request.user,
                 recipe_id=recipe).delete()
+            change_counter(recipes, 'shopping_cart_count', -1)
+            change_cart_totals(request.user.id, [recipe.id], -1)
             return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=True, methods=['GET'], pagination_class=None)
+    def similar(self, request, pk):
+        '''Похожие рецепты из таблицы, собранной build_similar_recipes.'''
+        recipes = (Recipe.objects.filter(similar_to__recipe_id=pk)
+                   .order_by('-similar_to__score'))
+        with timed('serialize'):
+            data = recipe_summaries(recipes, request)
+        if not data:
+            get_object_or_404(Recipe, id=pk)
+        return Response(data)
+
+    @action(detail=False,
+            url_path='favorite',
+            methods=['POST', 'DELETE'],
+            permission_classes=(IsAuthenticated,))
+    @transaction.atomic
+    def favorite_batch(self, request):
+        '''Пакетное изменение избранного: {"ids": [...]}.'''
+        return self.batch(request, Favorite, 'recipe',
+                          Recipe.objects.all(), 'favorites_count')
+
+    @action(detail=False,
+            url_path='shopping_cart',
+            methods=['POST', 'DELETE'],
+            permission_classes=(IsAuthenticated,))
+    @transaction.atomic
+    def shopping_cart_batch(self, request):
+        '''Пакетное изменение списка покупок: {"ids": [...]}.'''
+        return self.batch(request, ShoppingList, 'recipe_id',
+                          Recipe.objects.all(), 'shopping_cart_count',
+                          on_change=change_cart_totals)
+
+    @shopping_cart_batch.mapping.get
+    def shopping_cart_summary(self, request):
+        '''Итоги списка покупок по ингредиентам.'''
+        totals = (CartTotal.objects.filter(user=request.user)
+                  .values_list('ingredient', 'ingredient__name',
+                               'ingredient__measurement_unit', 'amount'))
+        return Response({
+            'recipes': ShoppingList.objects.filter(user=request.user).count(),
+            'ingredients': [
+                dict(zip(('id', 'name', 'measurement_unit', 'amount'), row))
+                for row in totals
+            ],
+        })
+
     @action(detail=False,
             permission_classes=(IsAuthenticated,),
+            content_negotiation_class=IgnoreFormatNegotiation,
             methods=['GET'])
     def download_shopping_cart(self, request):
-        ingredients = (SumIngredients.objects.filter(
-            recipe__recipe_list__user=request.user)
-            .values('ingredient')
-            .annotate(total_amount=Sum('amount'))
-            .values_list(
-                'ingredient__name',
-                'total_amount',
-                'ingredient__measurement_unit'
-        ))
-        file_list = []
-        [file_list.append(
-            '{} - {} {}.'.format(*ingredient)) for ingredient in ingredients]
-        response = HttpResponse(
-            'Cписок покупок:\n' + '\n'.join(file_list),
-            content_type='text/plain'
-        )
-        response['Content-Disposition'] = (
-            f'attachment; filename={settings.FILE_NAME}'
+        export_format = request.query_params.get('format', 'txt')
+        export = EXPORT_RENDERERS.get(export_format)
+        if export is None:
+            return Response(
+                {'errors': 'Доступные форматы: {}'.format(
+                    ', '.join(EXPORT_RENDERERS))},
+                status=status.HTTP_400_BAD_REQUEST)
+        ingredients = (CartTotal.objects.filter(user=request.user)
+                       .order_by('ingredient_id')
+                       .values_list('ingredient__name', 'amount',
+                                    'ingredient__measurement_unit'))
+        if isinstance(request._request, ASGIRequest):
+            # ASGIHandler перебирает потоковый ответ в цикле событий,
+            # где запросы к БД запрещены: строки читаются здесь,
+            # в потоке представления.
+            rows = list(ingredients)
+        else:
+            rows = ingredients.iterator(
+                chunk_size=settings.EXPORT_CHUNK_SIZE)
+        response = StreamingHttpResponse(
+            export(rows),
+            content_type=export.content_type
         )
+        response['Content-Disposition'] = 'attachment; filename={}.{}'.format(
+            settings.FILE_NAME, export_format)
         return response
@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+import logging
+import random
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+PIN_KEY = 'db:pinned:{}'
+
+replica = ContextVar('replica', default=None)
+
+
+@contextmanager
+def read_from_primary():
+    '''Чтение с основной БД внутри блока.'''
+    token = replica.set(None)
+    try:
+        yield
+    finally:
+        replica.reset(token)
+
+
+def primary_if(condition):
+    return read_from_primary() if condition else nullcontext()
+
+
+class ReplicaRouter:
+    """
+    Чтение с реплики, выбранной ReplicaMiddleware для запроса,
+    запись и чтение внутри транзакций - с основной БД.
+    """
+    def db_for_read(self, model, **hints):
+        alias = replica.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+def pin_key(request):
+    credentials = (request.META.get('HTTP_AUTHORIZATION')
+                   or request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+    if credentials:
+        return PIN_KEY.format(hashlib.md5(credentials.encode()).hexdigest())
+    return None
+
+
+class ReplicaMiddleware:
+    """
+    Безопасные запросы к API читают с реплики. Клиент, выполнивший
+    запись, на REPLICA_PIN_SECONDS закрепляется за основной БД.
+    Ошибка БД, 401 или 404 на реплике - повтор запроса на основной БД.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        alias = self.route(request)
+        token = replica.set(alias)
+        try:
+            response = self.get_response(request)
+        finally:
+            replica.reset(token)
+        if alias and self.replica_failed(request, response, alias):
+            response = self.get_response(request)
+        self.pin(request, response)
+        return response
+
+    async def __acall__(self, request):
+        alias = await sync_to_async(self.route)(request)
+        token = replica.set(alias)
+        try:
+            response = await self.get_response(request)
+        finally:
+            replica.reset(token)
+        if alias and self.replica_failed(request, response, alias):
+            response = await self.get_response(request)
+        await sync_to_async(self.pin)(request, response)
+        return response
+
+    def route(self, request):
+        '''Реплика для чтения или None, если запрос идёт в основную БД.'''
+        if (not settings.DATABASE_REPLICAS
+                or not request.path.startswith(settings.REPLICA_URL_PREFIX)
+                or request.method not in SAFE_METHODS):
+            return None
+        key = pin_key(request)
+        if key and cache.get(key):
+            return None
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def replica_failed(self, request, response, alias):
+        # Реплика может ещё не получить объект или токен,
+        # созданные на основной БД.
+        failed = (getattr(request, 'replica_failed', False)
+                  or response.status_code == 404
+                  or pin_key(request) and response.status_code == 401)
+        if failed:
+            logger.info('Повтор запроса %s на основной БД вместо %s '
+                        '(статус %s)', request.path, alias,
+                        response.status_code)
+            request.replica_failed = False
+        return failed
+
+    def pin(self, request, response):
+        if (not settings.DATABASE_REPLICAS
+                or not request.path.startswith(settings.REPLICA_URL_PREFIX)
+                or request.method in SAFE_METHODS
+                or response.status_code >= 400):
+            return
+        key = pin_key(request)
+        if key:
+            cache.set(key, True, settings.REPLICA_PIN_SECONDS)
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, DatabaseError) and replica.get():
+            request.replica_failed = True
@@ -31,7 +31,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.timing.TimingMiddleware',
+    'api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'backend.db_router.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -59,6 +62,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'backend.wsgi.application'
+ASGI_URLCONF = 'backend.asgi_urls'
 
 
 DATABASES = {
@@ -73,6 +77,62 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения: через запятую хосты PostgreSQL
+# или, для SQLite, пути к файлам БД.
+for number, location in enumerate(
+        filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'NAME' if 'sqlite' in DATABASES['default']['ENGINE'] else 'HOST':
+            location.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['backend.db_router.ReplicaRouter']
+REPLICA_URL_PREFIX = '/api/'
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 10))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+# Поколения кэша API, ответы, фрагменты карточек и токены должны быть
+# видны всем процессам. LocMemCache у каждого процесса свой: с ним
+# сервер запускается только в одном процессе (см. gunicorn.conf.py),
+# для нескольких процессов и контейнеров нужен memcached.
+CACHE_SHARED = (CACHES['default']['BACKEND']
+                != 'django.core.cache.backends.locmem.LocMemCache')
+
+API_CACHE_TIMEOUT = 60 * 15
+RECIPE_CARD_TIMEOUT = 60 * 60 * 24
+
+TOKEN_CACHE_TIMEOUT = 60 * 5
+TOKEN_CACHE_SIZE = 10000
+
+BATCH_MAX_SIZE = 500
+
+# Server-Timing для всех ответов, а не только для персонала
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'false').lower() == 'true'
+SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', 500))
+SLOW_REQUEST_STATEMENTS = 20
+
+SIMILAR_RECIPES_TOP_K = 10
+SIMILAR_CART_WEIGHT = 0.5
+
+TRENDING_HALF_LIFE_HOURS = 24
+TRENDING_WINDOW_HOURS = 24 * 7
+TRENDING_FAVORITE_WEIGHT = 1.0
+TRENDING_CART_WEIGHT = 0.5
+
+INGREDIENT_INDEX_TTL = 60 * 5
+INGREDIENT_SEARCH_LIMIT = 20
+INGREDIENT_SEARCH_MAX_LIMIT = 100
+
 
 AUTH_USER_MODEL = "users.User"
 
@@ -95,11 +155,15 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
@@ -151,6 +215,13 @@ STATIC_ROOT = '/static/backend_static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/media'
 
+# Уменьшенные копии изображений рецептов: имя -> наибольшие (ширина, высота)
+IMAGE_RENDITIONS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'full': (1280, 1280),
+}
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -166,4 +237,8 @@ TEXT_LENGHT = 3000
 MIN_AMOUNT = 1
 MAX_AMOUNT = 32000
 # Download shopping_list
-FILE_NAME = 'shopping_cart.txt'
+FILE_NAME = 'shopping_cart'
+EXPORT_CHUNK_SIZE = 2000
+PDF_FONT_PATH = os.getenv(
+    'PDF_FONT_PATH',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf')
@@ -0,0 +1,28 @@
+import os
+import shutil
+
+from django.conf import settings
+from prometheus_client import multiprocess
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+
+def on_starting(server):
+    '''
+    Несколько процессов только с общим кэшем: с кэшем процесса смена
+    поколения не дошла бы до остальных, и они отдавали бы устаревшие
+    ответы и 304. Метрики прошлого запуска не попадают в суммы.
+    '''
+    if server.cfg.workers > 1 and not settings.CACHE_SHARED:
+        raise RuntimeError(
+            'Для нескольких процессов нужен общий кэш: '
+            'задайте CACHE_BACKEND и CACHE_LOCATION (memcached)')
+    path = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(worker.pid)
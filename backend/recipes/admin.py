@@ -18,7 +18,7 @@ class TagAdmin(admin.ModelAdmin):
 @admin.register(models.Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     list_display = ('id', 'author', 'name', 'image',
-                    'text', 'cooking_time')
+                    'text', 'cooking_time', 'favorites_count')
     inlines = (SumIngredientsInline,)
 
 
@@ -0,0 +1,105 @@
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+from recipes.models import CartTotal, Recipe, ShoppingList, SumIngredients
+
+USERS_CHUNK_SIZE = 500
+
+
+def lock_recipes(recipe_ids):
+    '''
+    Блокировка строк рецептов до конца транзакции, по порядку id.
+    Изменение состава рецепта и добавление или удаление его из списка
+    покупок берут её до чтения состава: иначе удаление из списка со
+    старым составом и перенос нового состава в списки с ещё не
+    удалённой строкой дают расхождение итогов.
+    '''
+    list(Recipe.objects.select_for_update().filter(id__in=recipe_ids)
+         .order_by('id').values_list('id', flat=True))
+
+
+def recipe_amounts(recipe_ids):
+    '''Суммы ингредиентов рецептов: {ingredient_id: количество}.'''
+    return dict(
+        SumIngredients.objects.filter(recipe_id__in=recipe_ids)
+        .order_by()
+        .values_list('ingredient')
+        .annotate(total=Sum('amount'))
+    )
+
+
+def apply_deltas(user_ids, deltas):
+    '''
+    Изменение итогов пользователей на {ingredient_id: изменение}
+    одним UPDATE с F(): параллельные изменения не теряются.
+    Нулевые итоги удаляются.
+    '''
+    deltas = {ingredient: delta for ingredient, delta in deltas.items()
+              if delta}
+    if not user_ids or not deltas:
+        return
+    CartTotal.objects.bulk_create([
+        CartTotal(user_id=user_id, ingredient_id=ingredient, amount=0)
+        for user_id in user_ids
+        for ingredient, delta in deltas.items() if delta > 0
+    ], ignore_conflicts=True)
+    totals = CartTotal.objects.filter(user_id__in=user_ids,
+                                      ingredient_id__in=deltas)
+    totals.update(amount=F('amount') + Case(
+        *(When(ingredient_id=ingredient, then=Value(delta))
+          for ingredient, delta in deltas.items()),
+        default=Value(0),
+        output_field=IntegerField(),
+    ))
+    totals.filter(amount__lte=0).delete()
+
+
+def change_cart_totals(user_id, recipe_ids, sign):
+    '''Рецепты добавлены (sign=1) или удалены (sign=-1) из списка.'''
+    lock_recipes(recipe_ids)
+    apply_deltas([user_id], {
+        ingredient: sign * amount
+        for ingredient, amount in recipe_amounts(recipe_ids).items()
+    })
+
+
+def propagate_recipe_changes(recipe_id, deltas):
+    '''
+    Изменение состава рецепта во всех списках покупок с ним.
+    Вызывается после lock_recipes, взятой до чтения прежнего состава.
+    '''
+    user_ids = list(ShoppingList.objects.filter(recipe_id=recipe_id)
+                    .order_by('user_id')
+                    .values_list('user_id', flat=True))
+    for start in range(0, len(user_ids), USERS_CHUNK_SIZE):
+        apply_deltas(user_ids[start:start + USERS_CHUNK_SIZE], deltas)
+
+
+def expected_totals(user_ids):
+    '''Итоги по исходным таблицам: {(user_id, ingredient_id): сумма}.'''
+    rows = (SumIngredients.objects
+            .filter(recipe__recipe_list__user__in=user_ids)
+            .order_by()
+            .values_list('recipe__recipe_list__user', 'ingredient')
+            .annotate(total=Sum('amount')))
+    return {(user_id, ingredient): total
+            for user_id, ingredient, total in rows}
+
+
+@transaction.atomic
+def rebuild_cart_totals(user_ids, expected=None):
+    '''
+    Пересборка итогов пользователей по исходным таблицам.
+    expected - готовый результат expected_totals для этих пользователей.
+    '''
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    if expected is None:
+        expected = expected_totals(user_ids)
+    CartTotal.objects.filter(user_id__in=user_ids).delete()
+    CartTotal.objects.bulk_create([
+        CartTotal(user_id=user_id, ingredient_id=ingredient, amount=amount)
+        for (user_id, ingredient), amount in expected.items()
+        if user_id in user_ids
+    ])
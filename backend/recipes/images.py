@@ -0,0 +1,128 @@
+import io
+import logging
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image
+
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+RENDITION_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+# Копия для кратких карточек рецептов вместо исходного изображения.
+SUMMARY_RENDITION = ('thumbnail', 'jpeg')
+
+# Изображений за один проход обработчика.
+BATCH_SIZE = 100
+
+
+def rendition_path(image, renditions, name, extension):
+    '''Путь к копии изображения или к исходному файлу, пока копии нет.'''
+    if renditions.get('source') != image:
+        return image
+    return renditions.get('sizes', {}).get(name, {}).get(extension, image)
+
+
+def render(image, size, image_format, options):
+    '''Уменьшенная копия изображения в заданном формате.'''
+    copy = image.copy()
+    copy.thumbnail(size, Image.LANCZOS)
+    buffer = io.BytesIO()
+    copy.save(buffer, image_format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def build_renditions(recipe):
+    '''
+    Создание всех вариантов изображения рецепта.
+    В source хранится имя исходного файла: варианты от прежнего
+    изображения не отдаются клиентам.
+    '''
+    storage = recipe.image.storage
+    with recipe.image.open('rb') as original:
+        image = Image.open(original)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    flat = image
+    if image.mode == 'RGBA':
+        flat = Image.new('RGB', image.size, (255, 255, 255))
+        flat.paste(image, mask=image.getchannel('A'))
+    sizes = {}
+    for name, size in settings.IMAGE_RENDITIONS.items():
+        sizes[name] = {}
+        for extension, (image_format, options) in RENDITION_FORMATS.items():
+            source = image if image_format == 'WEBP' else flat
+            sizes[name][extension] = storage.save(
+                f'recipe/renditions/{recipe.id}/{name}.{extension}',
+                render(source, size, image_format, options)
+            )
+    return {'source': recipe.image.name, 'sizes': sizes}
+
+
+def delete_renditions(storage, renditions):
+    for formats in renditions.get('sizes', {}).values():
+        for path in formats.values():
+            storage.delete(path)
+
+
+def process_recipe_image(recipe_id):
+    '''
+    Создание вариантов изображения и сохранение путей к ним.
+    Если изображение успело смениться, результат отбрасывается,
+    а рецепт остаётся в очереди для нового изображения.
+    '''
+    recipe = Recipe.objects.filter(id=recipe_id).first()
+    if recipe is None:
+        return
+    if not recipe.image:
+        Recipe.objects.filter(id=recipe_id, image='').update(
+            renditions_pending=False)
+        return
+    renditions = build_renditions(recipe)
+    with transaction.atomic():
+        current = (Recipe.objects.select_for_update()
+                   .filter(id=recipe_id, image=renditions['source']).first())
+        if current is None:
+            delete_renditions(recipe.image.storage, renditions)
+            return
+        stale = current.renditions
+        current.renditions = renditions
+        current.renditions_pending = False
+        current.save(update_fields=['renditions', 'renditions_pending'])
+    delete_renditions(recipe.image.storage, stale)
+
+
+def process_pending():
+    '''
+    Обработка очередной пачки рецептов из очереди.
+    Ошибка снимает рецепт с очереди, чтобы не повторяться
+    на каждом проходе: его вернёт новое изображение или --all.
+    '''
+    pending = list(Recipe.objects.filter(renditions_pending=True)
+                   .order_by('id')
+                   .values_list('id', 'image')[:BATCH_SIZE])
+    for recipe_id, image in pending:
+        try:
+            process_recipe_image(recipe_id)
+        except Exception:
+            logger.exception('Не удалось обработать изображение рецепта %s',
+                             recipe_id)
+            Recipe.objects.filter(id=recipe_id, image=image).update(
+                renditions_pending=False)
+    return len(pending)
+
+
+def schedule_renditions(recipe):
+    '''
+    Постановка изображения в очередь обработчика build_renditions.
+    Запрос только отмечает рецепт: изображения уменьшаются в отдельном
+    процессе, а не в процессах веб-сервера.
+    '''
+    Recipe.objects.filter(id=recipe.id).update(renditions_pending=True)
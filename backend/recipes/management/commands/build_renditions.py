@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from recipes.images import process_pending
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """
+    Создание уменьшенных копий изображений рецептов.
+    С --watch работает как отдельный обработчик очереди: веб-процессы
+    только отмечают рецепты с новыми изображениями.
+    """
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересоздать копии для всех рецептов',
+        )
+        parser.add_argument(
+            '--watch',
+            action='store_true',
+            help='Не завершаться: обрабатывать очередь постоянно',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Пауза между проверками пустой очереди, секунд',
+        )
+
+    def handle(self, *args, **options):
+        self.enqueue(options['all'])
+        processed = self.drain()
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {processed}'))
+        while options['watch']:
+            close_old_connections()
+            if not self.drain():
+                time.sleep(options['interval'])
+
+    def enqueue(self, rebuild):
+        '''Постановка в очередь рецептов без готовых копий.'''
+        recipes = Recipe.objects.exclude(image='').filter(
+            renditions_pending=False)
+        if rebuild:
+            recipes.update(renditions_pending=True)
+            return
+        stale = [
+            recipe.id
+            for recipe in recipes.only('id', 'image', 'renditions').iterator()
+            if recipe.renditions.get('source') != recipe.image.name
+        ]
+        Recipe.objects.filter(id__in=stale).update(renditions_pending=True)
+
+    def drain(self):
+        processed = 0
+        while True:
+            count = process_pending()
+            processed += count
+            if not count:
+                return processed
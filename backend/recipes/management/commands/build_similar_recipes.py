@@ -0,0 +1,60 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.similarity import (interaction_matrix, nearest_neighbours,
+                                store_neighbours)
+
+
+class Command(BaseCommand):
+    """Пересчёт похожих рецептов по избранному"""
+    help = ('Пересчёт таблицы похожих рецептов; '
+            'запускается периодически, например из cron')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=settings.SIMILAR_RECIPES_TOP_K,
+            help='Количество похожих рецептов для каждого рецепта',
+        )
+        parser.add_argument(
+            '--with-cart',
+            action='store_true',
+            help='Учитывать списки покупок наравне с избранным',
+        )
+        parser.add_argument(
+            '--block-size',
+            type=int,
+            default=1000,
+            help='Количество рецептов в одном блоке расчёта близости',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=10000,
+            help='Количество строк, читаемых из БД за раз',
+        )
+
+    def handle(self, *args, **options):
+        for option in ('top_k', 'block_size', 'chunk_size'):
+            if options[option] < 1:
+                raise CommandError(f'--{option.replace("_", "-")} '
+                                   'должен быть больше нуля')
+        started = time.monotonic()
+        matrix, recipe_ids = interaction_matrix(
+            with_cart=options['with_cart'],
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(f'Матрица {matrix.shape[0]} x {matrix.shape[1]}, '
+                          f'взаимодействий {matrix.nnz}')
+        total = store_neighbours(
+            nearest_neighbours(matrix, options['top_k'],
+                               options['block_size']),
+            recipe_ids,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Сохранено пар похожих рецептов: {total}, '
+            f'{time.monotonic() - started:.2f} с'
+        ))
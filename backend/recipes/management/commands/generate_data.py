@@ -0,0 +1,214 @@
+import io
+import random
+import secrets
+import time
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from api.cache import bump_generation
+from recipes.cart_totals import rebuild_cart_totals
+from recipes.management.commands.create_tags import create_tags
+from recipes.management.commands.rebuild_counters import rebuild_counters
+from recipes.models import (Favorite, Ingredient, Recipe, ShoppingList,
+                            SumIngredients, Tag)
+from recipes.trending import refresh_trending
+from users.models import Follow, User
+
+IMAGE_NAME = 'recipe/images/synthetic.png'
+PASSWORD = 'benchmark-password'
+
+
+class Command(BaseCommand):
+    """Генерация синтетических данных для нагрузочного тестирования"""
+    help = ('Создание пользователей, подписок, рецептов, избранного '
+            'и списков покупок пакетами bulk_create')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--tags-per-recipe', type=int, default=2)
+        parser.add_argument('--follows-per-user', type=int, default=10)
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--cart-per-user', type=int, default=5)
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество объектов в одном bulk_create',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=None,
+            help='Зерно генератора случайных чисел для повторяемости',
+        )
+        parser.add_argument(
+            '--prefix',
+            default=None,
+            help='Префикс имён; по умолчанию случайный, '
+                 'чтобы повторные запуски добавляли данные',
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['recipes'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь и рецепт')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+        started = time.monotonic()
+        generator = DataGenerator(
+            random.Random(options['seed']),
+            options['prefix'] or secrets.token_hex(3),
+            options['batch_size'],
+        )
+        if not Ingredient.objects.exists():
+            call_command('load_csv', stdout=io.StringIO())
+        if not Tag.objects.exists():
+            create_tags()
+        users = generator.users(options['users'])
+        self.report('пользователей', len(users), started)
+        recipes = generator.recipes(
+            users, options['recipes'],
+            options['ingredients_per_recipe'], options['tags_per_recipe'])
+        self.report('рецептов', len(recipes), started)
+        total = generator.links(Follow, 'following', users, users,
+                                options['follows_per_user'])
+        self.report('подписок', total, started)
+        total = generator.links(Favorite, 'recipe', users, recipes,
+                                options['favorites_per_user'])
+        self.report('добавлений в избранное', total, started)
+        total = generator.links(ShoppingList, 'recipe_id', users, recipes,
+                                options['cart_per_user'])
+        self.report('добавлений в списки покупок', total, started)
+        rebuild_counters()
+        # Списки покупок созданы bulk_create, мимо пошаговых итогов.
+        for start in range(0, len(users), options['batch_size']):
+            rebuild_cart_totals(users[start:start + options['batch_size']])
+        refresh_trending()
+        bump_generation('recipes', 'tags', 'ingredients')
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные созданы за {time.monotonic() - started:.1f} с, '
+            f'пароль пользователей: {PASSWORD}'
+        ))
+
+    def report(self, name, total, started):
+        self.stdout.write(f'Создано {name}: {total} '
+                          f'({time.monotonic() - started:.1f} с)')
+
+
+class DataGenerator:
+    """
+    Синтетические данные с неравномерной популярностью:
+    вероятность выбора объекта убывает как 1 / ранг.
+    """
+    def __init__(self, rng, prefix, batch_size):
+        self.rng = rng
+        self.prefix = prefix
+        self.batch_size = batch_size
+
+    def batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield range(start, min(start + self.batch_size, total))
+
+    def users(self, total):
+        password = make_password(PASSWORD)
+        ids = []
+        for batch in self.batches(total):
+            names = [f'bench_{self.prefix}_{number}' for number in batch]
+            User.objects.bulk_create([
+                User(username=name, email=f'{name}@example.com',
+                     first_name='Тест', last_name=name, password=password)
+                for name in names
+            ])
+            created = list(User.objects.filter(username__in=names)
+                           .values_list('id', flat=True))
+            Token.objects.bulk_create([
+                Token(key=Token.generate_key(), user_id=user_id)
+                for user_id in created
+            ])
+            ids.extend(created)
+        return ids
+
+    def recipes(self, authors, total, ingredients_per_recipe,
+                tags_per_recipe):
+        ingredients = list(Ingredient.objects.values_list('id', 'name'))
+        tags = list(Tag.objects.values_list('id', flat=True))
+        words = [name for _, name in ingredients]
+        image = self.image()
+        weights = self.weights(len(authors))
+        ids = []
+        for batch in self.batches(total):
+            names = [f'Рецепт {self.prefix}-{number}' for number in batch]
+            Recipe.objects.bulk_create([
+                Recipe(
+                    author_id=author,
+                    name=name,
+                    text=' '.join(self.rng.sample(words, 12)),
+                    cooking_time=self.rng.randint(5, 180),
+                    image=image,
+                )
+                for name, author in zip(
+                    names, self.rng.choices(authors, cum_weights=weights,
+                                            k=len(names)))
+            ])
+            created = list(Recipe.objects.filter(name__in=names)
+                           .values_list('id', flat=True))
+            SumIngredients.objects.bulk_create([
+                SumIngredients(recipe_id=recipe, ingredient_id=ingredient,
+                               amount=self.rng.randint(1, 500))
+                for recipe in created
+                for ingredient, _ in self.rng.sample(
+                    ingredients, min(ingredients_per_recipe,
+                                     len(ingredients)))
+            ], batch_size=self.batch_size)
+            Recipe.tags.through.objects.bulk_create([
+                Recipe.tags.through(recipe_id=recipe, tag_id=tag)
+                for recipe in created
+                for tag in self.rng.sample(
+                    tags, min(tags_per_recipe, len(tags)))
+            ], batch_size=self.batch_size)
+            ids.extend(created)
+        return ids
+
+    def links(self, model, target_field, users, targets, per_user):
+        """Связи пользователей с популярными объектами без повторов."""
+        attname = model._meta.get_field(target_field).attname
+        weights = self.weights(len(targets))
+        # Подписка на себя не создаётся: для Follow целей на одну меньше.
+        available = len(targets) - 1 if model is Follow else len(targets)
+        per_user = min(per_user, available)
+        total = 0
+        batch = []
+        for user in users:
+            chosen = set()
+            while len(chosen) < per_user:
+                target = self.rng.choices(targets, cum_weights=weights)[0]
+                if target != user or model is not Follow:
+                    chosen.add(target)
+            batch.extend(model(user_id=user, **{attname: target})
+                         for target in chosen)
+            if len(batch) >= self.batch_size:
+                model.objects.bulk_create(batch, ignore_conflicts=True)
+                total += len(batch)
+                batch = []
+        model.objects.bulk_create(batch, ignore_conflicts=True)
+        return total + len(batch)
+
+    def weights(self, total):
+        order = list(range(1, total + 1))
+        self.rng.shuffle(order)
+        return list(accumulate(1 / rank for rank in order))
+
+    def image(self):
+        if not default_storage.exists(IMAGE_NAME):
+            buffer = io.BytesIO()
+            Image.new('RGB', (640, 480), (200, 120, 60)).save(buffer, 'PNG')
+            default_storage.save(IMAGE_NAME, ContentFile(buffer.getvalue()))
+        return IMAGE_NAME
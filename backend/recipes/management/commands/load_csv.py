@@ -1,27 +1,170 @@
 import csv
+import io
+import time
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 
+from api.cache import bump_generation
 from recipes.models import Ingredient
 
+FIELDNAMES = ('name', 'measurement_unit')
+
 
 class Command(BaseCommand):
     """Загрузка данных в БД"""
+    help = 'Загрузка ингредиентов из CSV-файла пакетами'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=settings.BASE_DIR / 'data' / 'ingredients.csv',
+            help='CSV-файл со строками "название,единица измерения"',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество строк в одном пакете',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только проверить файл, ничего не записывая в БД',
+        )
+
     def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+        before = Ingredient.objects.count()
+        started = time.monotonic()
         try:
-            ingredients_load()
-            print('Ингредиенты загружены')
-        except Exception as er:
-            print(er)
-
-
-def ingredients_load():
-    with open('./data/ingredients.csv',
-              encoding='utf-8') as csv_file:
-        fieldnames = ['name', 'measurement_unit']
-        csv_reader = csv.DictReader(csv_file, fieldnames=fieldnames)
-        for row in csv_reader:
-            Ingredient.objects.get_or_create(
-                name=row['name'],
-                measurement_unit=row['measurement_unit']
-            )
+            with open(options['path'], encoding='utf-8') as csv_file:
+                total = ingredients_load(
+                    csv_file,
+                    batch_size=options['batch_size'],
+                    dry_run=options['dry_run'],
+                    progress=self.progress(started),
+                )
+        except OSError as error:
+            raise CommandError(f'Не удалось прочитать файл: {error}')
+        except ValueError as error:
+            raise CommandError(str(error))
+        elapsed = time.monotonic() - started
+        if options['dry_run']:
+            self.stdout.write(f'Проверено строк: {total}, '
+                              f'ошибок нет ({elapsed:.2f} с)')
+            return
+        bump_generation('ingredients', 'recipes')
+        created = Ingredient.objects.count() - before
+        self.stdout.write(self.style.SUCCESS(
+            f'Ингредиенты загружены: строк {total}, новых {created}, '
+            f'{elapsed:.2f} с'
+        ))
+
+    def progress(self, started):
+        def report(total):
+            rate = total / max(time.monotonic() - started, 1e-6)
+            self.stdout.write(f'Обработано строк: {total} ({rate:.0f} в с)')
+        return report
+
+
+def read_batches(csv_file, batch_size):
+    '''Построчное чтение файла с проверкой и разбиением на пакеты.'''
+    batch = []
+    for line, row in enumerate(csv.reader(csv_file), start=1):
+        if not row:
+            continue
+        if len(row) != len(FIELDNAMES):
+            raise ValueError(f'Строка {line}: ожидалось 2 поля, '
+                             f'получено {len(row)}')
+        name, measurement_unit = (value.strip() for value in row)
+        if not name or not measurement_unit:
+            raise ValueError(f'Строка {line}: пустое значение')
+        if (len(name) > settings.NAME_LENGHT
+                or len(measurement_unit) > settings.UNIT_LENGHT):
+            raise ValueError(f'Строка {line}: значение слишком длинное')
+        batch.append((name, measurement_unit))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Loader:
+    """
+    Запись пакетов строк в рамках одной транзакции.
+    По умолчанию каждый пакет записывается сразу, и finish
+    дописывать нечего.
+    """
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def __call__(self, batch):
+        raise NotImplementedError
+
+    def finish(self):
+        return None
+
+
+class BulkLoader(Loader):
+    """Загрузка через bulk_create с пропуском существующих строк."""
+    def __call__(self, batch):
+        Ingredient.objects.bulk_create(
+            [Ingredient(name=name, measurement_unit=unit)
+             for name, unit in batch],
+            ignore_conflicts=True,
+        )
+
+
+class CopyLoader(Loader):
+    """
+    Загрузка через COPY во временную таблицу PostgreSQL,
+    finish переносит строки из неё в таблицу ингредиентов.
+    """
+    def __init__(self, cursor):
+        super().__init__(cursor)
+        self.cursor.execute(
+            'CREATE TEMPORARY TABLE ingredient_staging '
+            '(name text, measurement_unit text) ON COMMIT DROP'
+        )
+
+    def __call__(self, batch):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(batch)
+        buffer.seek(0)
+        self.cursor.copy_expert(
+            'COPY ingredient_staging (name, measurement_unit) '
+            'FROM STDIN WITH (FORMAT csv)',
+            buffer
+        )
+
+    def finish(self):
+        table = connection.ops.quote_name(Ingredient._meta.db_table)
+        self.cursor.execute(
+            f'INSERT INTO {table} (name, measurement_unit) '
+            'SELECT DISTINCT name, measurement_unit FROM ingredient_staging '
+            'ON CONFLICT ON CONSTRAINT name_unit DO NOTHING'
+        )
+
+
+@transaction.atomic
+def ingredients_load(csv_file, batch_size, dry_run=False, progress=None):
+    total = 0
+    if dry_run:
+        for batch in read_batches(csv_file, batch_size):
+            total += len(batch)
+        return total
+    with connection.cursor() as cursor:
+        loader_class = (CopyLoader if connection.vendor == 'postgresql'
+                        else BulkLoader)
+        loader = loader_class(cursor)
+        for batch in read_batches(csv_file, batch_size):
+            loader(batch)
+            total += len(batch)
+            if progress:
+                progress(total)
+        loader.finish()
+    return total
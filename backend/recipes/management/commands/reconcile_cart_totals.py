@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+
+from recipes.cart_totals import expected_totals, rebuild_cart_totals
+from recipes.models import CartTotal
+from users.models import User
+
+
+class Command(BaseCommand):
+    """Сверка итогов списков покупок с рецептами в списках"""
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Пользователей за один проход',
+        )
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Пересобрать итоги пользователей с расхождениями',
+        )
+
+    def handle(self, *args, **options):
+        user_ids = list(User.objects.order_by('id')
+                        .values_list('id', flat=True))
+        size = options['batch_size']
+        mismatched = set()
+        for start in range(0, len(user_ids), size):
+            chunk = user_ids[start:start + size]
+            expected = expected_totals(chunk)
+            actual = {
+                (user_id, ingredient): amount
+                for user_id, ingredient, amount in CartTotal.objects.filter(
+                    user_id__in=chunk
+                ).values_list('user_id', 'ingredient_id', 'amount')
+            }
+            for key in expected.keys() | actual.keys():
+                if expected.get(key) != actual.get(key):
+                    mismatched.add(key[0])
+                    self.stdout.write(
+                        f'Пользователь {key[0]}, ингредиент {key[1]}: '
+                        f'ожидается {expected.get(key, 0)}, '
+                        f'в итогах {actual.get(key, 0)}'
+                    )
+            if options['fix']:
+                rebuild_cart_totals(mismatched.intersection(chunk),
+                                    expected)
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Итоги пересобраны для пользователей: {len(mismatched)}'))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'Пользователей с расхождениями: {len(mismatched)}'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import bump_generation
+from recipes.trending import refresh_trending
+
+
+class Command(BaseCommand):
+    """Пересчёт популярности рецептов за последнее время"""
+    help = ('Пересчёт trending_score с затуханием по времени по всему '
+            'окну TRENDING_WINDOW_HOURS; запускается периодически, '
+            'например из cron')
+
+    def handle(self, *args, **options):
+        changed = refresh_trending()
+        if changed:
+            bump_generation('recipes')
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено рецептов: {changed}'))
@@ -0,0 +1,55 @@
+# Generated by Django 3.2 on 2026-10-18 04:18
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_created(apps, schema_editor):
+    '''Время старых добавлений неизвестно: берётся дата публикации
+    рецепта, чтобы они не попали в популярное за последнее время.
+    Это условное значение, а не время добавления: created строк,
+    созданных до миграции, не годится для статистики по времени.'''
+    Recipe = apps.get_model('recipes', 'Recipe')
+    for model_name, field in (('Favorite', 'recipe'),
+                              ('ShoppingList', 'recipe_id')):
+        model = apps.get_model('recipes', model_name)
+        model.objects.update(created=Subquery(
+            Recipe.objects.filter(pk=OuterRef(field)).values('pub_date')
+        ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_similar_recipe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorite',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False, verbose_name='Популярность за последнее время'),
+        ),
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-trending_score', '-id'], name='recipe_trending_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['cooking_time', '-id'], name='recipe_cooking_time_idx'),
+        ),
+        migrations.RunPython(backfill_created, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 3.2 on 2026-10-18 04:21
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicates(apps, schema_editor):
+    '''Повторные строки списка покупок удаляются, счётчик пересчитывается.'''
+    ShoppingList = apps.get_model('recipes', 'ShoppingList')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    keep = (ShoppingList.objects.order_by()
+            .values('user', 'recipe_id')
+            .annotate(first=Min('id'))
+            .values('first'))
+    ShoppingList.objects.exclude(id__in=keep).delete()
+    Recipe.objects.update(shopping_cart_count=Coalesce(
+        Subquery(
+            ShoppingList.objects.filter(recipe_id=OuterRef('pk'))
+            .order_by()
+            .values('recipe_id')
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_trending'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='shoppinglist',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe_id'), name='unique_user_recipe_shopping_list'),
+        ),
+    ]
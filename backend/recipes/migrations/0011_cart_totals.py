@@ -0,0 +1,56 @@
+# Generated by Django 3.2 on 2026-10-18 04:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def fill_cart_totals(apps, schema_editor):
+    '''Итоги существующих списков покупок пакетами.'''
+    SumIngredients = apps.get_model('recipes', 'SumIngredients')
+    CartTotal = apps.get_model('recipes', 'CartTotal')
+    rows = (SumIngredients.objects
+            .filter(recipe__recipe_list__isnull=False)
+            .order_by()
+            .values_list('recipe__recipe_list__user', 'ingredient')
+            .annotate(total=Sum('amount'))
+            .iterator())
+    batch = []
+    for user_id, ingredient_id, total in rows:
+        batch.append(CartTotal(user_id=user_id, ingredient_id=ingredient_id,
+                               amount=total))
+        if len(batch) >= 1000:
+            CartTotal.objects.bulk_create(batch)
+            batch = []
+    CartTotal.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0010_shopping_list_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CartTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField(verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_totals', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Итог списка покупок',
+                'verbose_name_plural': 'Итоги списков покупок',
+                'ordering': ['ingredient'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='carttotal',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_user_ingredient_cart_total'),
+        ),
+        migrations.RunPython(fill_cart_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2 on 2026-10-18 09:10
+
+from django.db import migrations, models
+
+
+def mark_pending(apps, schema_editor):
+    '''Рецепты, копии изображения которых ещё не созданы.'''
+    Recipe = apps.get_model('recipes', 'Recipe')
+    pending = [
+        recipe.id
+        for recipe in Recipe.objects.exclude(image='')
+        .only('id', 'image', 'renditions').iterator()
+        if recipe.renditions.get('source') != recipe.image.name
+    ]
+    for start in range(0, len(pending), 1000):
+        Recipe.objects.filter(id__in=pending[start:start + 1000]).update(
+            renditions_pending=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_cart_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='renditions_pending',
+            field=models.BooleanField(db_index=True, default=False, editable=False, verbose_name='Копии изображения ожидают обработки'),
+        ),
+        migrations.RunPython(mark_pending, migrations.RunPython.noop),
+    ]
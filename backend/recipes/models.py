@@ -1,9 +1,10 @@
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator as max_value
 from django.core.validators import MinValueValidator as min_value
 from django.db import models
 
-from users.models import User
+from users.models import CountersMixin, User
 
 
 class Tag(models.Model):
@@ -57,7 +58,7 @@ class Ingredient(models.Model):
         return f'{self.name}, {self.measurement_unit}'
 
 
-class Recipe(models.Model):
+class Recipe(CountersMixin, models.Model):
     author = models.ForeignKey(
         User,
         on_delete=models.SET_NULL,
@@ -91,6 +92,17 @@ class Recipe(models.Model):
         verbose_name='Изображение блюда',
         upload_to='recipe/images/',
     )
+    renditions = models.JSONField(
+        verbose_name='Уменьшенные копии изображения',
+        default=dict,
+        editable=False,
+    )
+    renditions_pending = models.BooleanField(
+        verbose_name='Копии изображения ожидают обработки',
+        default=False,
+        editable=False,
+        db_index=True,
+    )
     text = models.TextField(
         verbose_name='Описание блюда',
         max_length=settings.TEXT_LENGHT
@@ -102,11 +114,48 @@ class Recipe(models.Model):
             max_value(settings.MAX_AMOUNT)
         ]
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+        editable=False,
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        verbose_name='В списках покупок',
+        default=0,
+        editable=False,
+    )
+    trending_score = models.FloatField(
+        verbose_name='Популярность за последнее время',
+        default=0,
+        editable=False,
+    )
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False,
+    )
+
+    counter_fields = ('favorites_count', 'shopping_cart_count',
+                      'trending_score')
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='recipe_pub_date_id_idx'),
+            models.Index(fields=['-favorites_count', '-id'],
+                         name='recipe_favorites_count_idx'),
+            models.Index(fields=['author', '-pub_date'],
+                         name='recipe_author_pub_date_idx'),
+            models.Index(fields=['-trending_score', '-id'],
+                         name='recipe_trending_score_idx'),
+            models.Index(fields=['cooking_time', '-id'],
+                         name='recipe_cooking_time_idx'),
+        ]
+        # GIN-индекс по search_vector и триггеры полнотекстового поиска
+        # создаются миграцией 0007 отдельно для PostgreSQL и SQLite.
 
     def __str__(self):
         return self.name
@@ -165,6 +214,11 @@ class Favorite(models.Model):
         related_name='favorites',
         verbose_name='Рецепт',
     )
+    created = models.DateTimeField(
+        verbose_name='Дата добавления',
+        auto_now_add=True,
+        db_index=True,
+    )
 
     class Meta:
         ordering = ['-id']
@@ -194,11 +248,91 @@ class ShoppingList(models.Model):
         related_name='recipe_list',
         verbose_name='рецепт'
     )
+    created = models.DateTimeField(
+        verbose_name='Дата добавления',
+        auto_now_add=True,
+        db_index=True,
+    )
 
     class Meta:
         verbose_name = 'Список рецептов'
         verbose_name_plural = 'Список рецептов'
         ordering = ['-id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe_id'],
+                name='unique_user_recipe_shopping_list'
+            )
+        ]
 
     def __str__(self):
         return f'{self.user.username} - {self.recipe_id.name}'
+
+
+class CartTotal(models.Model):
+    """
+    Сумма ингредиента по всем рецептам списка покупок пользователя.
+    Меняется вместе со списком покупок и составом рецептов в нём.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='cart_totals',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Ингредиент'
+    )
+    amount = models.IntegerField('Количество')
+
+    class Meta:
+        verbose_name = 'Итог списка покупок'
+        verbose_name_plural = 'Итоги списков покупок'
+        ordering = ['ingredient']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_user_ingredient_cart_total'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user.username}: {self.ingredient.name} {self.amount}'
+
+
+class SimilarRecipe(models.Model):
+    """Похожие рецепты по совместному добавлению в избранное."""
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Рецепт',
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='Похожий рецепт',
+    )
+    score = models.FloatField(verbose_name='Косинусная близость')
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        ordering = ['recipe', '-score']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='unique_similar_recipe'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['recipe', '-score'],
+                         name='similar_recipe_score_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} ~ {self.similar_id}: {self.score:.3f}'
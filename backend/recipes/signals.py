@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Состав ингредиентов рецепта изменён массовыми операциями
+# (bulk_create/bulk_update), которые не отправляют post_save.
+recipe_ingredients_changed = Signal()
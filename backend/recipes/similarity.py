@@ -0,0 +1,93 @@
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from scipy import sparse
+
+from recipes.models import Favorite, ShoppingList, SimilarRecipe
+
+
+def read_pairs(queryset, fields, chunk_size):
+    '''Пары (пользователь, рецепт) массивом numpy, чтение частями.'''
+    rows = queryset.order_by().values_list(*fields).iterator(
+        chunk_size=chunk_size)
+    chunks = []
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        chunks.append(np.array(chunk, dtype=np.int64))
+    if not chunks:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.concatenate(chunks)
+
+
+def interaction_matrix(with_cart=False, chunk_size=10000):
+    '''
+    Разреженная матрица пользователь x рецепт и id рецептов её столбцов.
+    Добавление в список покупок учитывается с весом SIMILAR_CART_WEIGHT.
+    '''
+    sources = [(Favorite.objects.all(), ('user_id', 'recipe_id'), 1.0)]
+    if with_cart:
+        sources.append((ShoppingList.objects.all(),
+                        ('user_id', 'recipe_id_id'),
+                        settings.SIMILAR_CART_WEIGHT))
+    pairs, weights = [], []
+    for queryset, fields, weight in sources:
+        pairs.append(read_pairs(queryset, fields, chunk_size))
+        weights.append(np.full(len(pairs[-1]), weight, dtype=np.float32))
+    pairs = np.concatenate(pairs)
+    user_ids, users = np.unique(pairs[:, 0], return_inverse=True)
+    recipe_ids, recipes = np.unique(pairs[:, 1], return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.concatenate(weights), (users, recipes)),
+        shape=(len(user_ids), len(recipe_ids)),
+    )
+    return matrix, recipe_ids
+
+
+def nearest_neighbours(matrix, top_k, block_size=1000):
+    '''
+    Top-K соседей каждого рецепта по косинусной близости столбцов.
+    Матрица близости считается блоками по block_size рецептов,
+    поэтому память ограничена размером блока, а не квадратом числа
+    рецептов.
+    '''
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0))).ravel()
+    transposed = matrix.T.tocsr()
+    for start in range(0, matrix.shape[1], block_size):
+        block = (transposed[start:start + block_size] @ matrix).tocsr()
+        for row in range(block.shape[0]):
+            recipe = start + row
+            begin, end = block.indptr[row], block.indptr[row + 1]
+            neighbours = block.indices[begin:end]
+            scores = block.data[begin:end] / (norms[recipe]
+                                              * norms[neighbours])
+            other = neighbours != recipe
+            neighbours, scores = neighbours[other], scores[other]
+            if len(scores) > top_k:
+                best = np.argpartition(-scores, top_k)[:top_k]
+                neighbours, scores = neighbours[best], scores[best]
+            yield recipe, neighbours, scores
+
+
+@transaction.atomic
+def store_neighbours(neighbours, recipe_ids, batch_size=5000):
+    '''Замена таблицы похожих рецептов одной транзакцией.'''
+    SimilarRecipe.objects.all().delete()
+    total = 0
+    batch = []
+    for recipe, similar, scores in neighbours:
+        batch.extend(
+            SimilarRecipe(recipe_id=int(recipe_ids[recipe]),
+                          similar_id=int(recipe_ids[neighbour]),
+                          score=float(score))
+            for neighbour, score in zip(similar, scores)
+        )
+        if len(batch) >= batch_size:
+            SimilarRecipe.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+    SimilarRecipe.objects.bulk_create(batch)
+    return total + len(batch)
@@ -0,0 +1,61 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from recipes.models import Favorite, Recipe, ShoppingList
+
+
+def decay(age):
+    '''Вес события возраста age при экспоненциальном затухании.'''
+    return 0.5 ** (age / timedelta(hours=settings.TRENDING_HALF_LIFE_HOURS))
+
+
+def trending_scores(now):
+    '''
+    Сумма весов добавлений в избранное и список покупок за окно
+    TRENDING_WINDOW_HOURS. Окно каждый раз пересчитывается целиком:
+    читаются строки с created в окне (по индексу created), не вся
+    таблица. События группируются по часам в БД, поэтому в память
+    попадает не больше строк, чем рецептов x часов.
+    '''
+    since = now - timedelta(hours=settings.TRENDING_WINDOW_HOURS)
+    scores = defaultdict(float)
+    sources = (
+        (Favorite, 'recipe', settings.TRENDING_FAVORITE_WEIGHT),
+        (ShoppingList, 'recipe_id', settings.TRENDING_CART_WEIGHT),
+    )
+    for model, field, weight in sources:
+        rows = (model.objects.filter(created__gte=since)
+                .annotate(hour=TruncHour('created'))
+                .order_by()
+                .values_list(field, 'hour')
+                .annotate(total=Count('id')))
+        for recipe_id, hour, total in rows:
+            scores[recipe_id] += weight * total * decay(now - hour)
+    return scores
+
+
+@transaction.atomic
+def refresh_trending(now=None, batch_size=1000):
+    '''
+    Пересчёт trending_score по всему окну, а не по новым событиям:
+    удаление из избранного и списка покупок не оставляет следа,
+    который можно было бы применить приращением. Записываются только
+    рецепты, чей счёт изменился. Возвращает число изменённых.
+    '''
+    scores = trending_scores(now or timezone.now())
+    current = dict(Recipe.objects.filter(trending_score__gt=0)
+                   .values_list('id', 'trending_score'))
+    changed = [
+        Recipe(id=recipe_id, trending_score=scores.get(recipe_id, 0))
+        for recipe_id in current.keys() | scores.keys()
+        if current.get(recipe_id) != scores.get(recipe_id, 0)
+    ]
+    Recipe.objects.bulk_update(changed, ['trending_score'],
+                               batch_size=batch_size)
+    return len(changed)
@@ -0,0 +1,101 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from recipes.models import Ingredient, Recipe, SumIngredients, Tag
+from users.models import Follow, User
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    '''Поколения и ответы кэша не переходят между тестами.'''
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def create_user(username):
+    return User.objects.create_user(
+        username=username, email=f'{username}@example.com',
+        first_name='Имя', last_name=username, password='password')
+
+
+@pytest.fixture
+def reader(db):
+    return create_user('reader')
+
+
+@pytest.fixture
+def author(db):
+    return create_user('author')
+
+
+@pytest.fixture
+def recipes(author):
+    '''
+    Рецепты с разными изображениями: готовые копии (часть форматов),
+    копии от прежнего изображения и рецепт без изображения.
+    '''
+    breakfast = Tag.objects.create(name='Завтрак', color='#E26C2D',
+                                   slug='breakfast')
+    dinner = Tag.objects.create(name='Ужин', color='#49B64E', slug='dinner')
+    flour = Ingredient.objects.create(name='мука', measurement_unit='г')
+    milk = Ingredient.objects.create(name='молоко', measurement_unit='мл')
+    rendered = Recipe.objects.create(
+        author=author, name='Блины', text='Жарить', cooking_time=30,
+        image='recipe/images/pancakes.png',
+        renditions={
+            'source': 'recipe/images/pancakes.png',
+            'sizes': {
+                'thumbnail': {
+                    'webp': 'recipe/renditions/1/thumbnail.webp',
+                    'jpeg': 'recipe/renditions/1/thumbnail.jpeg',
+                },
+                'card': {'webp': 'recipe/renditions/1/card.webp'},
+            },
+        },
+    )
+    stale = Recipe.objects.create(
+        author=author, name='Оладьи', text='Печь', cooking_time=20,
+        image='recipe/images/fritters-new.png',
+        renditions={
+            'source': 'recipe/images/fritters-old.png',
+            'sizes': {
+                'thumbnail': {'webp': 'recipe/renditions/2/thumbnail.webp'},
+            },
+        },
+    )
+    plain = Recipe.objects.create(
+        author=author, name='Каша', text='Варить\u2028помешивая\u2029',
+        cooking_time=15, image='',
+    )
+    now = timezone.now()
+    for age, recipe in enumerate((rendered, stale, plain)):
+        Recipe.objects.filter(id=recipe.id).update(
+            pub_date=now - timedelta(minutes=age))
+    rendered.tags.set([breakfast, dinner])
+    stale.tags.set([breakfast])
+    SumIngredients.objects.bulk_create([
+        SumIngredients(recipe=rendered, ingredient=flour, amount=200),
+        SumIngredients(recipe=rendered, ingredient=milk, amount=500),
+        SumIngredients(recipe=stale, ingredient=flour, amount=150),
+    ])
+    return [rendered, stale, plain]
+
+
+@pytest.fixture
+def subscribed_authors(reader, author, recipes):
+    '''Подписки читателя: автор с рецептами и автор без рецептов.'''
+    empty = create_user('empty')
+    Follow.objects.create(user=reader, following=author)
+    Follow.objects.create(user=reader, following=empty)
+    User.objects.filter(id=author.id).update(recipes_count=len(recipes))
+    return [author, empty]
+
+
+@pytest.fixture
+def request_factory():
+    return APIRequestFactory(SERVER_NAME='localhost')
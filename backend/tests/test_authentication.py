@@ -0,0 +1,69 @@
+import pytest
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.authentication import CachedTokenAuthentication, local_tokens
+from users.models import User
+
+
+@pytest.fixture(autouse=True)
+def shared_cache(settings):
+    '''Кэш токенов включается только с общим кэшем.'''
+    settings.CACHE_SHARED = True
+    local_tokens.entries.clear()
+    yield
+    local_tokens.entries.clear()
+
+
+@pytest.fixture
+def token(reader):
+    return Token.objects.create(user=reader).key
+
+
+def authenticate(key):
+    return CachedTokenAuthentication().authenticate_credentials(key)[0]
+
+
+def test_cached_token_loads_fresh_user(reader, token):
+    authenticate(token)
+    User.objects.filter(id=reader.id).update(first_name='Другое')
+    user = authenticate(token)
+    assert user.id == reader.id
+    assert user.first_name == 'Другое'
+
+
+def test_logout_revokes_cached_token(
+        reader, token, django_capture_on_commit_callbacks):
+    authenticate(token)
+    with django_capture_on_commit_callbacks(execute=True):
+        Token.objects.filter(key=token).delete()
+    with pytest.raises(AuthenticationFailed):
+        authenticate(token)
+
+
+def test_deactivation_revokes_cached_token(
+        reader, token, django_capture_on_commit_callbacks):
+    authenticate(token)
+    with django_capture_on_commit_callbacks(execute=True):
+        reader.is_active = False
+        reader.save()
+    with pytest.raises(AuthenticationFailed):
+        authenticate(token)
+
+
+def test_inactive_user_is_rejected_without_signal(reader, token):
+    authenticate(token)
+    User.objects.filter(id=reader.id).update(is_active=False)
+    with pytest.raises(AuthenticationFailed):
+        authenticate(token)
+
+
+def test_password_change_keeps_new_password(reader, token):
+    user = authenticate(token)
+    user.set_password('n3w-Passw0rd!')
+    user.save()
+    # Следующий запрос того же токена не сохраняет прежний хэш пароля.
+    user = authenticate(token)
+    user.save()
+    reader.refresh_from_db()
+    assert reader.check_password('n3w-Passw0rd!')
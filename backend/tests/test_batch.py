@@ -0,0 +1,70 @@
+import pytest
+from django.conf import settings
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite
+from users.models import Follow
+
+
+@pytest.fixture
+def client(reader):
+    client = APIClient(SERVER_NAME='localhost')
+    client.force_authenticate(reader)
+    return client
+
+
+def statuses(response):
+    assert response.status_code == 200
+    return {result['id']: result['status']
+            for result in response.json()['results']}
+
+
+@pytest.mark.parametrize('url', ('/api/recipes/favorite/',
+                                 '/api/recipes/shopping_cart/'))
+def test_recipe_batch_statuses(client, recipes, url):
+    first, second, _ = (recipe.id for recipe in recipes)
+    response = client.post(url, {'ids': [first]}, format='json')
+    assert statuses(response) == {first: 'created'}
+    response = client.post(url, {'ids': [first, second, 999999, second]},
+                           format='json')
+    assert [result['id'] for result in response.json()['results']] == [
+        first, second, 999999]
+    assert statuses(response) == {first: 'exists', second: 'created',
+                                  999999: 'not_found'}
+    response = client.delete(url, {'ids': [second, 999999]}, format='json')
+    assert statuses(response) == {second: 'deleted', 999999: 'not_found'}
+
+
+def test_subscribe_batch_statuses(client, reader, author):
+    response = client.post('/api/users/subscribe/',
+                           {'ids': [author.id, reader.id]}, format='json')
+    results = response.json()['results']
+    assert statuses(response) == {author.id: 'created',
+                                  reader.id: 'invalid'}
+    assert results[1]['errors']
+    assert list(Follow.objects.values_list('user', 'following')) == [
+        (reader.id, author.id)]
+    response = client.delete('/api/users/subscribe/',
+                             {'ids': [author.id]}, format='json')
+    assert statuses(response) == {author.id: 'deleted'}
+
+
+@pytest.mark.parametrize('data', ({}, {'ids': []}, {'ids': [0]},
+                                  {'ids': 'строка'}))
+def test_batch_rejects_invalid_payload(client, recipes, data):
+    response = client.post('/api/recipes/favorite/', data, format='json')
+    assert response.status_code == 400
+    assert not Favorite.objects.exists()
+
+
+def test_batch_size_is_limited(client, recipes):
+    ids = list(range(1, settings.BATCH_MAX_SIZE + 2))
+    response = client.post('/api/recipes/favorite/', {'ids': ids},
+                           format='json')
+    assert response.status_code == 400
+
+
+def test_batch_requires_authentication(recipes):
+    response = APIClient(SERVER_NAME='localhost').post(
+        '/api/recipes/favorite/', {'ids': [recipes[0].id]}, format='json')
+    assert response.status_code == 401
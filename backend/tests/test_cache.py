@@ -0,0 +1,50 @@
+import pytest
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, Recipe, Tag
+
+
+@pytest.fixture
+def anonymous():
+    return APIClient(SERVER_NAME='localhost')
+
+
+def names(response):
+    return [recipe['name'] for recipe in response.json()['results']]
+
+
+def test_anonymous_list_is_cached_until_invalidated(
+        anonymous, recipes, django_capture_on_commit_callbacks):
+    assert names(anonymous.get('/api/recipes/'))[0] == 'Блины'
+    # Изменение мимо сигналов не сбрасывает кэш ответов.
+    Recipe.objects.filter(id=recipes[0].id).update(name='Скрыто')
+    assert names(anonymous.get('/api/recipes/'))[0] == 'Блины'
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe = Recipe.objects.get(id=recipes[0].id)
+        recipe.name = 'Сырники'
+        recipe.save()
+    assert names(anonymous.get('/api/recipes/'))[0] == 'Сырники'
+
+
+def test_query_order_shares_cached_response(anonymous, recipes):
+    first = anonymous.get('/api/recipes/?limit=2&page=1').json()
+    Recipe.objects.filter(id=recipes[0].id).update(name='Скрыто')
+    assert anonymous.get('/api/recipes/?page=1&limit=2').json() == first
+
+
+def test_tag_change_invalidates_tags(
+        anonymous, recipes, django_capture_on_commit_callbacks):
+    anonymous.get('/api/tags/')
+    with django_capture_on_commit_callbacks(execute=True):
+        Tag.objects.create(name='Обед', color='#8775D2', slug='lunch')
+    slugs = [tag['slug'] for tag in anonymous.get('/api/tags/').json()]
+    assert 'lunch' in slugs
+
+
+def test_authenticated_reads_bypass_response_cache(reader, recipes):
+    client = APIClient(SERVER_NAME='localhost')
+    client.force_authenticate(reader)
+    client.get('/api/recipes/')
+    # bulk_create не отправляет сигналов: флаги читаются при каждом запросе.
+    Favorite.objects.bulk_create([Favorite(user=reader, recipe=recipes[0])])
+    assert client.get('/api/recipes/').json()['results'][0]['is_favorited']
@@ -0,0 +1,72 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from api.cards import PAGE_FIELDS, recipe_cards
+from api.serializers import RecipeGetSerializer
+from recipes.models import Favorite, Recipe, ShoppingList
+from users.models import Follow
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+def get_request(request_factory, user):
+    request = Request(request_factory.get('/api/recipes/'))
+    request.user = user
+    return request
+
+
+def page(recipes):
+    return list(Recipe.objects.filter(id__in=[recipe.id for recipe in recipes])
+                .only(*PAGE_FIELDS).order_by('-pub_date'))
+
+
+def expected_cards(recipes, request):
+    return [
+        RecipeGetSerializer(recipe, context={'request': request}).data
+        for recipe in Recipe.objects.filter(
+            id__in=[recipe.id for recipe in recipes]).order_by('-pub_date')
+    ]
+
+
+def test_cards_match_serializer_with_user_flags(request_factory, reader,
+                                                author, recipes):
+    Favorite.objects.create(user=reader, recipe=recipes[0])
+    ShoppingList.objects.create(user=reader, recipe_id=recipes[1])
+    Follow.objects.create(user=reader, following=author)
+    request = get_request(request_factory, reader)
+    expected = render(expected_cards(recipes, request))
+    # Первый вызов собирает фрагменты, второй читает их из кэша.
+    assert render(recipe_cards(page(recipes), request)) == expected
+    assert render(recipe_cards(page(recipes), request)) == expected
+
+
+def test_cached_fragments_are_shared_between_users(request_factory, reader,
+                                                   author, recipes):
+    recipe_cards(page(recipes), get_request(request_factory, author))
+    Favorite.objects.create(user=reader, recipe=recipes[2])
+    request = get_request(request_factory, reader)
+    assert (render(recipe_cards(page(recipes), request))
+            == render(expected_cards(recipes, request)))
+
+
+def test_cards_without_author(request_factory, reader, author, recipes):
+    author.delete()
+    request = get_request(request_factory, reader)
+    cards = recipe_cards(page(recipes), request)
+    assert all(card['author'] is None for card in cards)
+    assert render(cards) == render(expected_cards(recipes, request))
+
+
+def test_card_is_rebuilt_after_recipe_change(
+        request_factory, reader, recipes, django_capture_on_commit_callbacks):
+    request = get_request(request_factory, reader)
+    recipe_cards(page(recipes), request)
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe = Recipe.objects.get(id=recipes[0].id)
+        recipe.name = 'Блины с мёдом'
+        recipe.save()
+    cards = recipe_cards(page(recipes), request)
+    assert cards[0]['name'] == 'Блины с мёдом'
+    assert render(cards) == render(expected_cards(recipes, request))
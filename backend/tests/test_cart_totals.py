@@ -0,0 +1,63 @@
+import pytest
+from rest_framework.test import APIClient
+
+from recipes.cart_totals import expected_totals
+from recipes.models import CartTotal, Ingredient, SumIngredients
+from users.models import User
+
+
+def client_for(user):
+    client = APIClient(SERVER_NAME='localhost')
+    client.force_authenticate(user)
+    return client
+
+
+def totals():
+    return {(user_id, ingredient): amount for user_id, ingredient, amount
+            in CartTotal.objects.values_list('user', 'ingredient', 'amount')}
+
+
+def recount():
+    return expected_totals(User.objects.values_list('id', flat=True))
+
+
+@pytest.fixture
+def carts(reader, author, recipes):
+    for user in (reader, author):
+        client_for(user).post('/api/recipes/shopping_cart/',
+                              {'ids': [recipe.id for recipe in recipes[:2]]},
+                              format='json')
+    return client_for(reader), client_for(author)
+
+
+def test_totals_follow_cart_changes(reader, recipes, carts):
+    client, _ = carts
+    assert totals() == recount()
+    flour = SumIngredients.objects.filter(recipe=recipes[0]).order_by(
+        'id').first().ingredient_id
+    assert totals()[(reader.id, flour)] == 350
+    client.delete(f'/api/recipes/{recipes[0].id}/shopping_cart/')
+    assert totals() == recount()
+    client.post(f'/api/recipes/{recipes[0].id}/shopping_cart/')
+    client.delete('/api/recipes/shopping_cart/',
+                  {'ids': [recipe.id for recipe in recipes]}, format='json')
+    assert totals() == recount()
+    assert not CartTotal.objects.filter(user=reader).exists()
+
+
+def test_totals_follow_recipe_edits(recipes, carts):
+    _, client = carts
+    salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+    flour = SumIngredients.objects.filter(recipe=recipes[0]).order_by(
+        'id').first().ingredient_id
+    response = client.patch(f'/api/recipes/{recipes[0].id}/', {
+        'tags': list(recipes[0].tags.values_list('id', flat=True)),
+        'ingredients': [{'id': flour, 'amount': 250},
+                        {'id': salt.id, 'amount': 5}],
+        'name': 'Блины', 'text': 'Жарить', 'cooking_time': 30,
+    }, format='json')
+    assert response.status_code == 200
+    assert totals() == recount()
+    response = client.delete(f'/api/recipes/{recipes[1].id}/')
+    assert response.status_code == 204
+    assert totals() == recount()
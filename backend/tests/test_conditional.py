@@ -0,0 +1,45 @@
+import pytest
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+
+
+@pytest.fixture
+def anonymous():
+    return APIClient(SERVER_NAME='localhost')
+
+
+def test_not_modified_until_invalidated(
+        anonymous, recipes, django_capture_on_commit_callbacks):
+    url = f'/api/recipes/{recipes[0].id}/'
+    response = anonymous.get(url)
+    etag = response['ETag']
+    assert etag.startswith('W/')
+    response = anonymous.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+    assert not response.content
+    response = anonymous.get(
+        url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+    assert response.status_code == 304
+    with django_capture_on_commit_callbacks(execute=True):
+        Recipe.objects.get(id=recipes[0].id).save()
+    response = anonymous.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+
+def test_etag_follows_user_data(
+        reader, recipes, django_capture_on_commit_callbacks):
+    client = APIClient(SERVER_NAME='localhost')
+    client.force_authenticate(reader)
+    etag = client.get('/api/recipes/')['ETag']
+    assert APIClient(SERVER_NAME='localhost').get(
+        '/api/recipes/')['ETag'] != etag
+    assert client.get('/api/recipes/', HTTP_IF_NONE_MATCH=etag
+                      ).status_code == 304
+    with django_capture_on_commit_callbacks(execute=True):
+        client.post(f'/api/recipes/{recipes[0].id}/favorite/')
+    response = client.get('/api/recipes/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.json()['results'][0]['is_favorited']
@@ -0,0 +1,90 @@
+import pytest
+from rest_framework.test import APIClient
+
+from api.utils import change_counter
+from recipes.management.commands.rebuild_counters import rebuild_counters
+from recipes.models import Recipe
+from users.models import User
+
+
+@pytest.fixture
+def client(reader):
+    client = APIClient(SERVER_NAME='localhost')
+    client.force_authenticate(reader)
+    return client
+
+
+def counters(recipe):
+    recipe.refresh_from_db()
+    return recipe.favorites_count, recipe.shopping_cart_count
+
+
+def test_favorite_and_cart_counters(client, recipes):
+    recipe = recipes[0]
+    client.post(f'/api/recipes/{recipe.id}/favorite/')
+    client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+    assert counters(recipe) == (1, 1)
+    client.post('/api/recipes/favorite/',
+                {'ids': [recipe.id, recipes[1].id]}, format='json')
+    assert counters(recipe) == (1, 1)
+    assert counters(recipes[1]) == (1, 0)
+    client.delete(f'/api/recipes/{recipe.id}/favorite/')
+    client.delete('/api/recipes/shopping_cart/', {'ids': [recipe.id]},
+                  format='json')
+    assert counters(recipe) == (0, 0)
+
+
+def test_follower_and_recipe_counters(client, reader, author, recipes):
+    client.post(f'/api/users/{author.id}/subscribe/')
+    rebuild_counters()
+    author.refresh_from_db()
+    assert author.followers_count == 1
+    assert author.recipes_count == len(recipes)
+    client.delete(f'/api/users/{author.id}/subscribe/')
+    author.refresh_from_db()
+    assert author.followers_count == 0
+
+
+def test_counters_match_rebuild(client, author, recipes):
+    client.post('/api/recipes/favorite/',
+                {'ids': [recipe.id for recipe in recipes]}, format='json')
+    client.post('/api/recipes/shopping_cart/',
+                {'ids': [recipes[0].id]}, format='json')
+    client.post('/api/users/subscribe/', {'ids': [author.id]},
+                format='json')
+    before = (list(Recipe.objects.order_by('id').values_list(
+        'favorites_count', 'shopping_cart_count')),
+        list(User.objects.order_by('id').values_list('followers_count')))
+    rebuild_counters()
+    after = (list(Recipe.objects.order_by('id').values_list(
+        'favorites_count', 'shopping_cart_count')),
+        list(User.objects.order_by('id').values_list('followers_count')))
+    assert before == after
+
+
+def test_full_save_keeps_concurrent_counter_changes(author, recipes):
+    stale_user = User.objects.get(id=author.id)
+    stale_recipe = Recipe.objects.get(id=recipes[0].id)
+    change_counter(User.objects.filter(id=author.id), 'followers_count', 1)
+    change_counter(Recipe.objects.filter(id=recipes[0].id),
+                   'favorites_count', 1)
+    stale_user.first_name = 'Новое'
+    stale_user.save()
+    stale_recipe.name = 'Новое'
+    stale_recipe.save()
+    author.refresh_from_db()
+    recipes[0].refresh_from_db()
+    assert (author.first_name, author.followers_count) == ('Новое', 1)
+    assert (recipes[0].name, recipes[0].favorites_count) == ('Новое', 1)
+
+
+def test_set_password_keeps_counters(author):
+    client = APIClient(SERVER_NAME='localhost')
+    client.force_authenticate(User.objects.get(id=author.id))
+    change_counter(User.objects.filter(id=author.id), 'followers_count', 3)
+    response = client.post('/api/users/set_password/', {
+        'current_password': 'password', 'new_password': 'n3w-Passw0rd!'})
+    assert response.status_code == 204
+    author.refresh_from_db()
+    assert author.followers_count == 3
+    assert author.check_password('n3w-Passw0rd!')
@@ -0,0 +1,90 @@
+import pytest
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from backend.db_router import (ReplicaMiddleware, ReplicaRouter,
+                               read_from_primary)
+from recipes.models import Recipe
+
+TOKEN = 'Token 0123456789abcdef'
+
+
+@pytest.fixture(autouse=True)
+def replicas(settings):
+    settings.DATABASE_REPLICAS = ['replica_1']
+
+
+class View:
+    """Ответы по очереди и БД для чтения на момент каждого вызова."""
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.reads = []
+
+    def __call__(self, request):
+        self.reads.append(ReplicaRouter().db_for_read(Recipe))
+        return HttpResponse(status=self.statuses.pop(0))
+
+
+def call(view, method='get', path='/api/recipes/', token=TOKEN):
+    factory = RequestFactory()
+    headers = {'HTTP_AUTHORIZATION': token} if token else {}
+    return ReplicaMiddleware(view)(getattr(factory, method)(path, **headers))
+
+
+def test_safe_api_reads_use_replica():
+    view = View(200, 200, 200)
+    call(view)
+    call(view, path='/admin/')
+    call(view, method='post', path='/api/recipes/', token=None)
+    assert view.reads == ['replica_1', DEFAULT_DB_ALIAS, DEFAULT_DB_ALIAS]
+    assert ReplicaRouter().db_for_read(Recipe) == DEFAULT_DB_ALIAS
+
+
+def test_write_pins_client_to_primary():
+    view = View(201, 200, 200)
+    call(view, method='post')
+    call(view)
+    call(view, token='Token другой')
+    assert view.reads[1:] == [DEFAULT_DB_ALIAS, 'replica_1']
+
+
+def test_failed_write_does_not_pin():
+    view = View(400, 200)
+    call(view, method='post')
+    call(view)
+    assert view.reads[1] == 'replica_1'
+
+
+@pytest.mark.parametrize('status, token, retried', (
+    (404, None, True),
+    (401, TOKEN, True),
+    (401, None, False),
+    (403, TOKEN, False),
+))
+def test_retry_on_primary(status, token, retried):
+    view = View(status, 200)
+    response = call(view, token=token)
+    if retried:
+        assert view.reads == ['replica_1', DEFAULT_DB_ALIAS]
+        assert response.status_code == 200
+    else:
+        assert view.reads == ['replica_1']
+        assert response.status_code == status
+
+
+def test_read_from_primary_block():
+    def view(request):
+        with read_from_primary():
+            inside = ReplicaRouter().db_for_read(Recipe)
+        return HttpResponse(
+            f'{inside} {ReplicaRouter().db_for_read(Recipe)}')
+    response = call(view)
+    assert response.content.decode() == f'{DEFAULT_DB_ALIAS} replica_1'
+
+
+def test_without_replicas_everything_is_primary(settings):
+    settings.DATABASE_REPLICAS = []
+    view = View(200)
+    call(view)
+    assert view.reads == [DEFAULT_DB_ALIAS]
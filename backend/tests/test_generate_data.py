@@ -0,0 +1,26 @@
+import io
+
+from django.core.management import call_command
+from django.db.models import F
+
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingList, Tag
+from users.models import Follow
+
+
+def test_links_use_every_available_target(db, settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    # Текст рецепта - 12 случайных названий ингредиентов.
+    Ingredient.objects.bulk_create([
+        Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+        for number in range(12)
+    ])
+    Tag.objects.create(name='Завтрак', color='#E26C2D', slug='breakfast')
+    call_command('generate_data', users=3, recipes=2, follows_per_user=10,
+                 favorites_per_user=10, cart_per_user=10, seed=1,
+                 prefix='t', stdout=io.StringIO())
+    # Подписок на одну меньше, чем пользователей, рецепты - все.
+    assert Follow.objects.count() == 3 * 2
+    assert not Follow.objects.filter(user=F('following')).exists()
+    assert Favorite.objects.count() == ShoppingList.objects.count() == 3 * 2
+    assert set(Recipe.objects.values_list(
+        'favorites_count', 'shopping_cart_count')) == {(3, 3)}
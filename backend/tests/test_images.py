@@ -0,0 +1,78 @@
+import io
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from PIL import Image
+
+from api.serializers import SummaryRecipesSerializer
+from recipes.images import schedule_renditions
+from recipes.models import Recipe
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+
+
+def png(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (640, 480), color).save(buffer, 'PNG')
+    return ContentFile(buffer.getvalue())
+
+
+def upload(author, color='red'):
+    recipe = Recipe(author=author, name='Блины', text='Жарить',
+                    cooking_time=30)
+    recipe.image.save('pancakes.png', png(color), save=False)
+    recipe.save()
+    schedule_renditions(recipe)
+    return recipe
+
+
+def build():
+    call_command('build_renditions', stdout=io.StringIO())
+
+
+def test_request_only_enqueues(author):
+    recipe = upload(author)
+    recipe.refresh_from_db()
+    assert recipe.renditions_pending
+    assert recipe.renditions == {}
+    assert SummaryRecipesSerializer(recipe).data['image'] == recipe.image.url
+
+
+def test_worker_builds_renditions(author):
+    recipe = upload(author)
+    build()
+    recipe.refresh_from_db()
+    assert not recipe.renditions_pending
+    assert recipe.renditions['source'] == recipe.image.name
+    storage = recipe.image.storage
+    thumbnail = recipe.renditions['sizes']['thumbnail']['jpeg']
+    with storage.open(thumbnail) as file:
+        assert max(Image.open(file).size) == 160
+    assert (SummaryRecipesSerializer(recipe).data['image']
+            == storage.url(thumbnail))
+
+
+def test_replaced_image_is_processed_again(author):
+    recipe = upload(author)
+    build()
+    recipe.image.save('pancakes.png', png('blue'), save=False)
+    recipe.save(update_fields=['image'])
+    schedule_renditions(recipe)
+    build()
+    recipe.refresh_from_db()
+    assert not recipe.renditions_pending
+    assert recipe.renditions['source'] == recipe.image.name
+
+
+def test_broken_image_leaves_queue(author):
+    recipe = upload(author)
+    with recipe.image.storage.open(recipe.image.name, 'wb') as file:
+        file.write(b'broken')
+    build()
+    recipe.refresh_from_db()
+    assert not recipe.renditions_pending
+    assert recipe.renditions == {}
@@ -0,0 +1,24 @@
+import io
+
+import pytest
+
+from recipes.management.commands.load_csv import ingredients_load
+from recipes.models import Ingredient
+
+
+@pytest.mark.django_db
+def test_load_skips_existing_rows():
+    Ingredient.objects.create(name='соль', measurement_unit='г')
+    csv_file = io.StringIO('соль,г\nперец, г\n\nперец,г\nмука,кг\n')
+    assert ingredients_load(csv_file, batch_size=2) == 4
+    assert set(Ingredient.objects.values_list(
+        'name', 'measurement_unit')) == {
+        ('соль', 'г'), ('перец', 'г'), ('мука', 'кг')}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('content', ('соль\n', 'соль,г,кг\n', ' ,г\n'))
+def test_load_rejects_invalid_rows(content):
+    with pytest.raises(ValueError, match='Строка 1'):
+        ingredients_load(io.StringIO(content), batch_size=10)
+    assert not Ingredient.objects.exists()
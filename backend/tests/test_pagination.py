@@ -0,0 +1,76 @@
+from base64 import b64encode
+from datetime import timedelta
+from urllib.parse import urlencode
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.filters import ORDERINGS
+from recipes.models import Recipe
+
+
+@pytest.fixture
+def feed(author):
+    '''
+    Рецепты с повторяющимися датами и популярностью: соседние
+    страницы разделяет только уникальное последнее поле курсора.
+    '''
+    now = timezone.now()
+    recipes = Recipe.objects.bulk_create([
+        Recipe(author=author, name=f'Рецепт {number}', text='Текст',
+               cooking_time=10, image='recipe/images/image.png')
+        for number in range(23)
+    ])
+    for number, recipe in enumerate(recipes):
+        Recipe.objects.filter(id=recipe.id).update(
+            pub_date=now - timedelta(minutes=number // 5),
+            favorites_count=number % 3,
+            trending_score=0.5 if number % 7 == 0 else 0)
+    return recipes
+
+
+def walk(client, url, direction):
+    '''Страницы по ссылкам next или previous, начиная с url.'''
+    pages = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        page = response.json()
+        pages.append([recipe['id'] for recipe in page['results']])
+        last, url = url, page[direction]
+    return pages, last
+
+
+@pytest.mark.parametrize('ordering', (None, *ORDERINGS))
+@pytest.mark.parametrize('limit', (1, 4, 7))
+def test_cursor_walks_whole_feed(feed, ordering, limit):
+    client = APIClient(SERVER_NAME='localhost')
+    url = f'/api/recipes/?pagination=cursor&limit={limit}'
+    if ordering:
+        url += f'&ordering={ordering}'
+    expected = list(Recipe.objects.order_by(
+        *ORDERINGS.get(ordering, ('-pub_date', '-id')))
+        .values_list('id', flat=True))
+    forward, last = walk(client, url, 'next')
+    assert sum(forward, []) == expected
+    assert all(len(page) == limit for page in forward[:-1])
+    backward, _ = walk(client, last, 'previous')
+    assert sum(reversed(backward), []) == expected
+
+
+def test_cursor_has_no_count_unless_asked(feed):
+    client = APIClient(SERVER_NAME='localhost')
+    page = client.get('/api/recipes/?pagination=cursor&limit=5').json()
+    assert 'count' not in page
+    page = client.get(
+        '/api/recipes/?pagination=cursor&limit=5&count=true').json()
+    assert page['count'] == len(feed)
+
+
+@pytest.mark.parametrize('position', ('не json', '[1]', '{"id": 1}'))
+def test_malformed_cursor_is_not_found(feed, position):
+    client = APIClient(SERVER_NAME='localhost')
+    cursor = b64encode(urlencode({'p': position}).encode()).decode()
+    response = client.get('/api/recipes/', {'cursor': cursor})
+    assert response.status_code == 404
@@ -0,0 +1,105 @@
+import datetime
+import decimal
+import uuid
+
+import pytest
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from api.renderers import ORJSONRenderer
+from api.representations import recipe_details, recipe_summaries, subscriptions
+from api.serializers import (RecipeGetSerializer, SubscriptionSerializer,
+                             SummaryRecipesSerializer)
+from api.utils import annotate_is_subscribed
+from recipes.models import Recipe
+from users.models import User
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+def get_request(request_factory, user, path='/api/recipes/'):
+    request = Request(request_factory.get(path))
+    request.user = user
+    return request
+
+
+def test_recipe_details_match_serializer(request_factory, reader, recipes):
+    request = get_request(request_factory, reader)
+    details = recipe_details([recipe.id for recipe in recipes], request)
+    assert details.keys() == {recipe.id for recipe in recipes}
+    for recipe in Recipe.objects.filter(id__in=details):
+        expected = RecipeGetSerializer(recipe,
+                                       context={'request': request}).data
+        assert render(details[recipe.id]) == render(expected)
+
+
+def test_recipe_details_without_author(request_factory, reader, recipes):
+    '''Автор удалён: Recipe.author обнуляется (SET_NULL).'''
+    orphan = recipes[0]
+    orphan.author.delete()
+    orphan.refresh_from_db()
+    assert orphan.author is None
+    request = get_request(request_factory, reader)
+    expected = RecipeGetSerializer(orphan, context={'request': request}).data
+    details = recipe_details([orphan.id], request)[orphan.id]
+    assert details['author'] is None
+    assert render(details) == render(expected)
+
+
+@pytest.mark.parametrize('with_request', (True, False))
+def test_recipe_summaries_match_serializer(request_factory, reader, recipes,
+                                           with_request):
+    request = (get_request(request_factory, reader) if with_request
+               else None)
+    queryset = Recipe.objects.all()
+    expected = SummaryRecipesSerializer(queryset, many=True,
+                                        context={'request': request}).data
+    assert render(recipe_summaries(queryset, request)) == render(expected)
+
+
+@pytest.mark.parametrize('limit', (None, 0, 1, 2, 10))
+def test_subscriptions_match_serializer(request_factory, reader,
+                                        subscribed_authors, limit):
+    path = '/api/users/subscriptions/'
+    if limit is not None:
+        path += f'?recipes_limit={limit}'
+    request = get_request(request_factory, reader, path)
+    authors = list(annotate_is_subscribed(
+        User.objects.filter(following__user=reader), reader))
+    expected = SubscriptionSerializer(authors, many=True,
+                                      context={'request': request}).data
+    assert render(subscriptions(authors, limit)) == render(expected)
+
+
+@pytest.mark.parametrize('data', (
+    None,
+    {},
+    [],
+    {'text': 'строка\u2028перевод\u2029абзаца', 'emoji': '🍳'},
+    {'nested': [1, 2.5, -0.1, None, True, False, {'ключ': 'значение'}]},
+    {'created': datetime.datetime(2024, 5, 1, 12, 30, 15, 123456,
+                                  tzinfo=datetime.timezone.utc),
+     'day': datetime.date(2024, 5, 1),
+     'time': datetime.time(12, 30),
+     'amount': decimal.Decimal('1.50'),
+     'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678')},
+))
+def test_orjson_renderer_matches_json_renderer(data):
+    assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+def test_orjson_renderer_matches_recipe_output(request_factory, reader,
+                                               recipes):
+    request = get_request(request_factory, reader)
+    data = RecipeGetSerializer(Recipe.objects.all(), many=True,
+                               context={'request': request}).data
+    assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+def test_orjson_renderer_indent_matches_json_renderer():
+    data = {'text': 'a\u2028b', 'items': [1, 2]}
+    media_type = 'application/json; indent=4'
+    assert (ORJSONRenderer().render(data, media_type)
+            == JSONRenderer().render(data, media_type))
@@ -0,0 +1,63 @@
+import pytest
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from recipes.search import search_recipes
+
+
+@pytest.fixture
+def menu(author):
+    return {
+        name: Recipe.objects.create(author=author, name=name, text=text,
+                                    cooking_time=10, image='')
+        for name, text in (
+            ('Борщ', 'Свёкла, капуста и картофель'),
+            ('Картофельное пюре', 'Картофель отварить и размять'),
+            ('Драники', 'Натереть картофель, обжарить'),
+            ('Омлет', 'Яйца взбить с молоком'),
+        )
+    }
+
+
+def found(value):
+    return [recipe.name
+            for recipe in search_recipes(Recipe.objects.all(), value)]
+
+
+def test_search_matches_name_and_text(menu):
+    assert set(found('картофель')) == {'Борщ', 'Картофельное пюре',
+                                       'Драники'}
+    assert found('омлет') == ['Омлет']
+    assert found('молоко') == ['Омлет']
+
+
+def test_name_match_ranks_first(menu):
+    assert found('картофельное')[0] == 'Картофельное пюре'
+
+
+def test_search_follows_changes(menu):
+    recipe = menu['Омлет']
+    recipe.name = 'Фриттата'
+    recipe.save()
+    menu['Драники'].delete()
+    assert found('фриттата') == ['Фриттата']
+    assert found('омлет') == []
+    assert 'Драники' not in found('картофель')
+
+
+def test_query_without_words_finds_nothing(menu):
+    assert found('!!! ?') == []
+
+
+def test_search_endpoint(menu):
+    client = APIClient(SERVER_NAME='localhost')
+    response = client.get('/api/recipes/', {'search': 'драники'})
+    assert [recipe['name'] for recipe in response.json()['results']] == [
+        'Драники']
+    response = client.get('/api/recipes/', {
+        'search': 'картофель', 'pagination': 'cursor', 'limit': 2})
+    page = response.json()
+    assert len(page['results']) == 2
+    rest = client.get(page['next']).json()['results']
+    assert {recipe['name'] for recipe in page['results'] + rest} == {
+        'Борщ', 'Картофельное пюре', 'Драники'}
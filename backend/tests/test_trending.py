@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from recipes.models import Favorite, Recipe, ShoppingList
+from recipes.trending import refresh_trending
+from users.models import User
+
+
+def scores():
+    return dict(Recipe.objects.values_list('id', 'trending_score'))
+
+
+@pytest.fixture
+def events(reader, recipes):
+    now = timezone.now()
+    other = User.objects.create_user(username='other',
+                                     email='other@example.com')
+    Favorite.objects.create(user=reader, recipe=recipes[0])
+    Favorite.objects.create(user=other, recipe=recipes[0])
+    ShoppingList.objects.create(user=reader, recipe_id=recipes[1])
+    # Добавление старше окна в счёт не входит.
+    old = Favorite.objects.create(user=reader, recipe=recipes[2])
+    Favorite.objects.filter(id=old.id).update(created=now - timedelta(
+        days=30))
+    return now
+
+
+def test_refresh_trending_scores_window(settings, recipes, events):
+    settings.TRENDING_HALF_LIFE_HOURS = 10 ** 6
+    refresh_trending(events)
+    result = scores()
+    assert result[recipes[0].id] == pytest.approx(
+        2 * settings.TRENDING_FAVORITE_WEIGHT, rel=1e-3)
+    assert result[recipes[1].id] == pytest.approx(
+        settings.TRENDING_CART_WEIGHT, rel=1e-3)
+    assert result[recipes[2].id] == 0
+
+
+def test_refresh_trending_drops_removed_events(reader, recipes, events):
+    refresh_trending(events)
+    Favorite.objects.filter(recipe=recipes[0]).delete()
+    ShoppingList.objects.all().delete()
+    assert refresh_trending(events) == 2
+    assert set(scores().values()) == {0}
+    assert refresh_trending(events) == 0
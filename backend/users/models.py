@@ -5,7 +5,26 @@ from django.db import models
 from .validators import validate_username
 
 
-class User(AbstractUser):
+class CountersMixin:
+    """
+    Денормализованные счётчики меняются только через UPDATE с F().
+    Полное сохранение существующего объекта их не пишет: иначе
+    значения, прочитанные раньше, затёрли бы параллельные изменения.
+    Счётчик сохраняется, только если назван в update_fields.
+    """
+    counter_fields = ()
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if update_fields is None and not self._state.adding:
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+
+class User(CountersMixin, AbstractUser):
     """Класс пользователей."""
     username = models.CharField(
         max_length=settings.NAME_LENGHT,
@@ -23,6 +42,18 @@ class User(AbstractUser):
         unique=True,
         blank=False
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Количество рецептов',
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0,
+        editable=False,
+    )
+
+    counter_fields = ('recipes_count', 'followers_count')
 
     class Meta:
         verbose_name = 'Пользователь'